@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Dataset
+from .models import ChunkedUpload, Dataset, EquipmentRecord, IngestJob
 
 
 @admin.register(Dataset)
@@ -7,3 +7,23 @@ class DatasetAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'uploaded_at')
     search_fields = ('name',)
     ordering = ('-uploaded_at',)
+
+
+@admin.register(IngestJob)
+class IngestJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'progress', 'dataset', 'created_at')
+    list_filter = ('status',)
+    ordering = ('-created_at',)
+
+
+@admin.register(ChunkedUpload)
+class ChunkedUploadAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'size', 'chunk_size', 'dataset', 'created_at', 'completed_at')
+    ordering = ('-created_at',)
+
+
+@admin.register(EquipmentRecord)
+class EquipmentRecordAdmin(admin.ModelAdmin):
+    list_display = ('id', 'dataset', 'row', 'name', 'type', 'flowrate', 'pressure', 'temperature')
+    search_fields = ('name',)
+    raw_id_fields = ('dataset',)
@@ -0,0 +1,180 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.utils import timezone
+from django.utils.decorators import classonlymethod
+from django.utils.http import http_date
+from django.views import View
+from rest_framework import exceptions, permissions, status
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .jobs import Overloaded, run_bounded
+from .models import Dataset
+from .reports import get_report
+from .serializers import DatasetSerializer
+from .timing import phase
+from .views import (
+    datasets_etag,
+    not_modified_response,
+    report_validators,
+    requested_fields,
+    without_unused_blobs,
+)
+
+
+class AsyncAPIView(View):
+    """Async counterpart of APIView for the read endpoints served under ASGI.
+
+    Authentication, permissions, content negotiation and renderers come from
+    the REST_FRAMEWORK settings as for APIView, except the browsable API,
+    which renders synchronously. Authentication and queries go through
+    sync_to_async; handlers return DRF Responses, which are rendered here so
+    Django does not need another thread hop to render them.
+    """
+
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = api_settings.DEFAULT_PERMISSION_CLASSES
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Token/Basic auth only, like APIView.
+        view.csrf_exempt = True
+        return view
+
+    def get_renderers(self):
+        return [
+            renderer() for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+            if not issubclass(renderer, BrowsableAPIRenderer)
+        ]
+
+    async def check_permissions(self, request):
+        for permission in (permission() for permission in self.permission_classes):
+            if isinstance(permission, permissions.AllowAny):
+                # Needs no user, so skip authenticating.
+                continue
+            # Reading request.user authenticates, which may hit the database.
+            if not await sync_to_async(permission.has_permission)(request, self):
+                if request.authenticators and not request.successful_authenticator:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+
+    async def dispatch(self, request, *args, **kwargs):
+        renderers = self.get_renderers()
+        request = Request(request, authenticators=[auth() for auth in self.authentication_classes])
+        self.request = request
+        try:
+            negotiator = api_settings.DEFAULT_CONTENT_NEGOTIATION_CLASS()
+            request.accepted_renderer, request.accepted_media_type = negotiator.select_renderer(request, renderers)
+            await self.check_permissions(request)
+            handler = getattr(self, request.method.lower(), None)
+            if request.method.lower() not in self.http_method_names or handler is None:
+                raise exceptions.MethodNotAllowed(request.method)
+            response = await handler(request, *args, **kwargs)
+        except Http404:
+            response = self.exception_response(request, exceptions.NotFound())
+        except Overloaded:
+            response = Response(
+                {'detail': 'Server busy, retry shortly.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '1'},
+            )
+        except exceptions.APIException as exc:
+            response = self.exception_response(request, exc)
+        if isinstance(response, Response):
+            response = self.render(request, response, renderers[0], args, kwargs)
+        return response
+
+    def exception_response(self, request, exc):
+        headers = {}
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            auth_header = request.authenticators[0].authenticate_header(request) if request.authenticators else None
+            if auth_header:
+                headers['WWW-Authenticate'] = auth_header
+            else:
+                exc.status_code = status.HTTP_403_FORBIDDEN
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        return Response(data, status=exc.status_code, headers=headers)
+
+    def render(self, request, response, default_renderer, args, kwargs):
+        response.accepted_renderer = getattr(request, 'accepted_renderer', default_renderer)
+        response.accepted_media_type = getattr(request, 'accepted_media_type', default_renderer.media_type)
+        response.renderer_context = {'view': self, 'args': args, 'kwargs': kwargs, 'request': request}
+        rendered = HttpResponse(response.rendered_content, status=response.status_code)
+        for header, value in response.items():
+            rendered[header] = value
+        return rendered
+
+
+class PingView(AsyncAPIView):
+    permission_classes = [permissions.AllowAny]
+
+    async def get(self, request):
+        return Response({'status': 'ok', 'time': timezone.now()})
+
+
+class DatasetListView(AsyncAPIView):
+    async def get(self, request):
+        try:
+            fields = requested_fields(request, DatasetSerializer.LIST_FIELDS)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=400)
+        datasets = without_unused_blobs(Dataset.objects.order_by('-uploaded_at'), fields)[:5]
+        with phase('db'):
+            rows = [row async for row in datasets.values_list('id', 'updated_at')]
+        etag = datasets_etag(rows, fields, request.accepted_renderer.format)
+        not_modified = not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        with phase('db'):
+            datasets = [dataset async for dataset in datasets]
+        with phase('serialize'):
+            data = DatasetSerializer(datasets, many=True, fields=fields).data
+        return Response({'count': len(data), 'results': data}, headers={'ETag': etag, 'Vary': 'Accept'})
+
+
+class DatasetDetailView(AsyncAPIView):
+    async def get(self, request, pk):
+        try:
+            fields = requested_fields(request, DatasetSerializer.Meta.fields)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=400)
+        with phase('db'):
+            rows = [row async for row in Dataset.objects.filter(pk=pk).values_list('id', 'updated_at')]
+        if not rows:
+            raise Http404
+        etag = datasets_etag(rows, fields, request.accepted_renderer.format)
+        not_modified = not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        with phase('db'):
+            dataset = await without_unused_blobs(Dataset.objects.filter(pk=pk), fields).afirst()
+        if dataset is None:
+            raise Http404
+        with phase('serialize'):
+            data = DatasetSerializer(dataset, fields=fields).data
+        return Response(data, headers={'ETag': etag, 'Vary': 'Accept'})
+
+
+class DatasetReportView(AsyncAPIView):
+    async def get(self, request, pk):
+        with phase('db'):
+            dataset = await Dataset.objects.filter(pk=pk).afirst()
+        if dataset is None:
+            raise Http404
+        # reportlab rendering and file reads stay off the event loop.
+        with phase('report'):
+            path = await run_bounded(get_report, dataset)
+        etag, last_modified = report_validators(dataset, path)
+
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        resp = HttpResponse(await run_bounded(path.read_bytes), content_type='application/pdf')
+        resp['Content-Disposition'] = f'attachment; filename="chemflux_report_{dataset.id}.pdf"'
+        resp['ETag'] = etag
+        resp['Last-Modified'] = http_date(last_modified)
+        return resp
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+CACHE_ALIAS = 'tokens'
+CACHE_PREFIX = 'auth-token:'
+
+
+def token_cache_key(key):
+    return f'{CACHE_PREFIX}{key}'
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token auth that remembers resolved tokens for TOKEN_CACHE_TIMEOUT
+    seconds, so most requests skip the token/user join entirely. Entries are
+    evicted when the token is deleted or its user saved (api.signals)."""
+
+    def authenticate_credentials(self, key):
+        cache = caches[CACHE_ALIAS]
+        cache_key = token_cache_key(key)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, (user, token), settings.TOKEN_CACHE_TIMEOUT)
+        return user, token
+
+
+def forget_token(key):
+    caches[CACHE_ALIAS].delete(token_cache_key(key))
@@ -0,0 +1,243 @@
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from rest_framework.authtoken.models import Token
+
+from .models import Dataset
+from .records import delete_records, load_records
+from .reports import discard_report
+
+EQUIPMENT_TYPES = [
+    'Pump', 'Valve', 'Reactor', 'Heat Exchanger', 'Compressor', 'Tank', 'Filter', 'Mixer',
+    'Condenser', 'Boiler', 'Separator', 'Dryer', 'Column', 'Evaporator', 'Crusher', 'Conveyor',
+]
+# Mean and spread of the numeric columns in sample_equipment_data.csv.
+BASE_COLUMNS = [('Flowrate', 140.0, 60.0), ('Pressure', 2.6, 0.9), ('Temperature', 45.0, 20.0)]
+GENERATE_CHUNK_ROWS = 1_000_000
+# Response formats and encodings compared on the list and detail endpoints.
+TRANSFER_VARIANTS = {
+    'json': {},
+    'json+gzip': {'HTTP_ACCEPT_ENCODING': 'gzip'},
+    'json+br': {'HTTP_ACCEPT_ENCODING': 'br, gzip'},
+    'msgpack': {'HTTP_ACCEPT': 'application/msgpack'},
+    'msgpack+br': {'HTTP_ACCEPT': 'application/msgpack', 'HTTP_ACCEPT_ENCODING': 'br, gzip'},
+}
+
+
+def generate_csv(path, rows, numeric_columns=3, types=8, seed=0):
+    """Write a CSV shaped like sample_equipment_data.csv: a unique
+    ``Equipment Name``, a ``Type`` drawn from ``types`` equipment types and
+    ``numeric_columns`` numeric columns (Flowrate, Pressure, Temperature,
+    then Metric 4, Metric 5, ...). Rows are written in chunks, so 10M rows do
+    not need to fit in memory."""
+    rng = np.random.default_rng(seed)
+    # Past the built-in names: "Pump 2", "Valve 2", ...
+    type_names = [
+        EQUIPMENT_TYPES[i] if i < len(EQUIPMENT_TYPES)
+        else f'{EQUIPMENT_TYPES[i % len(EQUIPMENT_TYPES)]} {i // len(EQUIPMENT_TYPES) + 1}'
+        for i in range(types)
+    ]
+    columns = BASE_COLUMNS[:numeric_columns] + [
+        (f'Metric {i + 1}', 100.0, 25.0) for i in range(len(BASE_COLUMNS), numeric_columns)
+    ]
+    path = Path(path)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        for start in range(0, rows, GENERATE_CHUNK_ROWS):
+            n = min(GENERATE_CHUNK_ROWS, rows - start)
+            kinds = rng.integers(len(type_names), size=n)
+            chunk = pd.DataFrame({
+                'Equipment Name': [f'{type_names[k]} {start + i + 1}' for i, k in enumerate(kinds)],
+                'Type': np.asarray(type_names, dtype=object)[kinds],
+            })
+            for name, mean, spread in columns:
+                chunk[name] = np.abs(rng.normal(mean, spread, n)).round(1)
+            chunk.to_csv(f, index=False, header=start == 0)
+        if not rows:
+            pd.DataFrame(columns=['Equipment Name', 'Type'] + [c[0] for c in columns]).to_csv(f, index=False)
+    return path
+
+
+def _summarize(runs):
+    return {
+        'min': min(runs),
+        'median': statistics.median(runs),
+        'mean': statistics.fmean(runs),
+        'max': max(runs),
+        'runs': runs,
+    }
+
+
+def _timed(call):
+    start = time.perf_counter()
+    response = call()
+    if response.streaming:
+        b''.join(response.streaming_content)
+    else:
+        response.content
+    elapsed = time.perf_counter() - start
+    if response.status_code >= 400:
+        raise RuntimeError(f'{response.request["PATH_INFO"]} returned {response.status_code}')
+    return elapsed, response
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True, cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _wait_for_records(dataset_id, timeout=600):
+    """Wait for the background record load, so it does not compete with
+    the requests being timed."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = Dataset.objects.filter(pk=dataset_id).values_list('records_status', flat=True).first()
+        if status not in (Dataset.RECORDS_PENDING, Dataset.RECORDS_LOADING):
+            return status
+        time.sleep(0.05)
+    raise RuntimeError(f'Records for dataset {dataset_id} still loading after {timeout}s')
+
+
+def _clear_datasets():
+    Dataset.objects.all().delete()
+    for name in ('uploads', 'columnar'):
+        shutil.rmtree(Path(settings.MEDIA_ROOT) / name, ignore_errors=True)
+
+
+def bench_size(client, csv_path, repeat):
+    """Time the endpoints for one CSV. Uploads start from an empty table so
+    the duplicate check never short-circuits them."""
+    timings = {name: [] for name in [
+        'upload', 'list', 'list_expanded', 'detail', 'report_cold', 'report_warm', 'records_load', 'records_aggregate',
+    ]}
+    parse_stats = None
+    for _ in range(repeat):
+        _clear_datasets()
+        with open(csv_path, 'rb') as f:
+            elapsed, response = _timed(lambda: client.post('/api/upload/', {'file': f}))
+        timings['upload'].append(elapsed)
+        parse_stats = response.json().get('parse_stats')
+        _wait_for_records(response.json()['id'])
+    dataset_id = response.json()['id']
+
+    for _ in range(repeat):
+        timings['list'].append(_timed(lambda: client.get('/api/datasets/'))[0])
+        timings['list_expanded'].append(_timed(lambda: client.get('/api/datasets/?expand=summary'))[0])
+        timings['detail'].append(_timed(lambda: client.get(f'/api/datasets/{dataset_id}/'))[0])
+        discard_report(dataset_id)
+        timings['report_cold'].append(_timed(lambda: client.get(f'/api/datasets/{dataset_id}/report/'))[0])
+        timings['report_warm'].append(_timed(lambda: client.get(f'/api/datasets/{dataset_id}/report/'))[0])
+        # The record load, which runs on the worker pool after the upload.
+        delete_records(dataset_id)
+        dataset = Dataset.objects.get(pk=dataset_id)
+        start = time.perf_counter()
+        load_records(dataset)
+        timings['records_load'].append(time.perf_counter() - start)
+        timings['records_aggregate'].append(
+            _timed(lambda: client.get('/api/records/aggregate/?group_by=type&metrics=count,mean,min,max,std'))[0]
+        )
+    transfer = {
+        'list_expanded': bench_transfer(client, '/api/datasets/?expand=summary', repeat),
+        'detail': bench_transfer(client, f'/api/datasets/{dataset_id}/', repeat),
+    }
+    _clear_datasets()
+    return {name: _summarize(runs) for name, runs in timings.items()}, transfer, parse_stats
+
+
+def bench_transfer(client, url, repeat):
+    """Bytes on the wire and latency per format/encoding. The negotiated
+    Content-Type and Content-Encoding are recorded, since msgpack and brotli
+    are only served when installed."""
+    results = {}
+    for variant, headers in TRANSFER_VARIANTS.items():
+        runs = []
+        for _ in range(repeat):
+            elapsed, response = _timed(lambda: client.get(url, **headers))
+            runs.append(elapsed)
+        results[variant] = {
+            'bytes': len(response.content),
+            'content_type': response.get('Content-Type'),
+            'content_encoding': response.get('Content-Encoding', 'identity'),
+            'latency': _summarize(runs),
+        }
+    return results
+
+
+def run_benchmarks(sizes, repeat=3, numeric_columns=3, types=8, data_dir=None, log=print):
+    """Run the suite against a throwaway database and media directory and
+    return the results as a JSON-serialisable dict."""
+    data_dir = Path(data_dir) if data_dir else Path(tempfile.gettempdir()) / 'chemflux-bench'
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.TemporaryDirectory() as media_root, override_settings(
+        MEDIA_ROOT=media_root, RETENTION_INTERVAL=0, INGEST_ASYNC=False,
+    ):
+        # A file database rather than SQLite's in-memory default, so worker
+        # processes (background retention) see the same tables.
+        connections['default'].settings_dict['TEST']['NAME'] = str(Path(media_root) / 'bench.sqlite3')
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            user = User.objects.create_user('benchmark')
+            token = Token.objects.create(user=user)
+            client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+            results = []
+            for rows in sizes:
+                csv_path = data_dir / f'equipment-{rows}-{numeric_columns}-{types}.csv'
+                if not csv_path.exists():
+                    log(f'Generating {csv_path.name}')
+                    generate_csv(csv_path, rows, numeric_columns, types)
+                log(f'Benchmarking {rows} rows')
+                timings, transfer, parse_stats = bench_size(client, csv_path, repeat)
+                results.append({
+                    'rows': rows,
+                    'file_bytes': csv_path.stat().st_size,
+                    'timings': timings,
+                    'rows_per_second': {
+                        name: rows / timings[name]['median'] if timings[name]['median'] else None
+                        for name in ('upload', 'records_load')
+                    },
+                    'transfer': transfer,
+                    'parse_stats': parse_stats,
+                })
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+    return {
+        'commit': _git_commit(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'config': {
+            'repeat': repeat,
+            'numeric_columns': numeric_columns,
+            'types': types,
+            'csv_chunk_rows': settings.CSV_CHUNK_ROWS,
+            'record_batch_rows': settings.RECORD_BATCH_ROWS,
+            'record_batch_pause': settings.RECORD_BATCH_PAUSE,
+        },
+        'results': results,
+    }
+
+
+def write_results(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
@@ -0,0 +1,138 @@
+import numpy as np
+
+BIN_RULES = ['auto', 'fd', 'sturges', 'doane', 'scott', 'rice', 'sqrt']
+MAX_BINS = 1000
+MIN_POINTS = 3
+
+
+class ChartError(ValueError):
+    pass
+
+
+def _numeric_values(store, column):
+    if column not in store.specs:
+        raise ChartError(f'Unknown column "{column}".')
+    if not store.is_numeric(column):
+        raise ChartError(f'Column "{column}" is not numeric.')
+    return np.asarray(store.raw(column))
+
+
+def parse_bins(raw):
+    if not raw:
+        return 'auto'
+    if raw in BIN_RULES:
+        return raw
+    try:
+        bins = int(raw)
+    except ValueError:
+        raise ChartError(f'bins must be an integer or one of {", ".join(BIN_RULES)}.')
+    if not 1 <= bins <= MAX_BINS:
+        raise ChartError(f'bins must be between 1 and {MAX_BINS}.')
+    return bins
+
+
+def _sturges_width(x, span):
+    return span / (np.log2(x.size) + 1.0)
+
+
+def _fd_width(x, span):
+    iqr = np.subtract(*np.percentile(x, [75, 25]))
+    return 2.0 * iqr * x.size ** (-1.0 / 3.0)
+
+
+def _doane_width(x, span):
+    if x.size <= 2:
+        return 0.0
+    sigma = np.std(x)
+    if sigma == 0:
+        return 0.0
+    g1 = np.mean(((x - np.mean(x)) / sigma) ** 3)
+    sg1 = np.sqrt(6.0 * (x.size - 2) / ((x.size + 1.0) * (x.size + 3)))
+    return span / (1.0 + np.log2(x.size) + np.log2(1.0 + abs(g1) / sg1))
+
+
+def _auto_width(x, span):
+    fd = _fd_width(x, span)
+    sturges = _sturges_width(x, span)
+    return min(fd, sturges) if fd else sturges
+
+
+# Bin widths of numpy's named rules (see np.histogram_bin_edges).
+BIN_WIDTHS = {
+    'auto': _auto_width,
+    'fd': _fd_width,
+    'sturges': _sturges_width,
+    'doane': _doane_width,
+    'scott': lambda x, span: (24.0 * np.pi ** 0.5 / x.size) ** (1.0 / 3.0) * np.std(x),
+    'rice': lambda x, span: span / (2.0 * x.size ** (1.0 / 3.0)),
+    'sqrt': lambda x, span: span / np.sqrt(x.size),
+}
+
+
+def bin_count(values, bins):
+    """Number of equal-width bins a named rule asks for, at most MAX_BINS.
+    Counted before any edges exist: one outlier can make an adaptive rule
+    ask for billions of bins."""
+    if not isinstance(bins, str):
+        return bins
+    span = float(values.max() - values.min())
+    width = BIN_WIDTHS[bins](values, span) if span else 0.0
+    if not width:
+        return 1
+    return int(min(np.ceil(span / width), MAX_BINS))
+
+
+def histogram(store, column, bins='auto'):
+    values = _numeric_values(store, column)
+    present = values[~np.isnan(values)]
+    if len(present):
+        counts, edges = np.histogram(present, bins=bin_count(present, bins))
+    else:
+        counts, edges = np.array([], dtype=int), np.array([])
+    return {
+        'column': column,
+        'kind': 'histogram',
+        'bins': bins,
+        'edges': edges.tolist(),
+        'counts': counts.tolist(),
+        'missing': int(len(values) - len(present)),
+    }
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets downsampling; returns selected indices."""
+    n = len(x)
+    if threshold >= n or n <= MIN_POINTS:
+        return np.arange(n)
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    selected[-1] = n - 1
+    return selected
+
+
+def downsample(store, column, max_points):
+    values = _numeric_values(store, column)
+    rows = np.flatnonzero(~np.isnan(values))
+    y = values[rows]
+    keep = lttb(rows.astype(np.float64), y, max_points)
+    return {
+        'column': column,
+        'kind': 'series',
+        'total_points': int(len(rows)),
+        'x': rows[keep].tolist(),
+        'y': y[keep].tolist(),
+    }
@@ -0,0 +1,218 @@
+import gzip
+import hashlib
+import logging
+import os
+import re
+import shutil
+import uuid
+import zlib
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+from .models import ChunkedUpload
+from .uploadhandlers import HASH_ALGORITHM
+
+logger = logging.getLogger(__name__)
+
+PARTIAL_DIR = 'partial'
+CHUNK_SUFFIX = '.chunk'
+COPY_BLOCK = 1024 * 1024
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class ChunkedUploadError(ValueError):
+    pass
+
+
+class UploadConflict(ChunkedUploadError):
+    """The request does not fit the upload's current state (already
+    completed, or being completed by another request)."""
+
+
+class AssembledFile(File):
+    """The reassembled CSV. Exposes ``temporary_file_path`` like Django's
+    TemporaryUploadedFile, so saving it to a FileField moves the file into
+    place instead of copying it."""
+
+    def __init__(self, path, name, size):
+        super().__init__(open(path, 'rb'), name=name)
+        self.path = path
+        self.size = size
+
+    def temporary_file_path(self):
+        return str(self.path)
+
+    def discard(self):
+        self.close()
+        Path(self.path).unlink(missing_ok=True)
+
+
+def partial_root():
+    return Path(settings.MEDIA_ROOT) / PARTIAL_DIR
+
+
+def partial_path(upload):
+    return partial_root() / str(upload.id)
+
+
+def create_upload(name, size, chunk_size=None, sha256=''):
+    """Start an upload of ``size`` bytes. The chunk size is clamped to
+    UPLOAD_CHUNK_MAX; ``sha256``, if given, is checked on completion."""
+    name = os.path.basename(str(name or '').strip())
+    if not name:
+        raise ChunkedUploadError('name is required.')
+    try:
+        size = int(size)
+        chunk_size = int(chunk_size) if chunk_size else settings.UPLOAD_CHUNK_SIZE
+    except (TypeError, ValueError):
+        raise ChunkedUploadError('size and chunk_size must be integers.')
+    if size < 1:
+        raise ChunkedUploadError('size must be at least 1 byte.')
+    if chunk_size < 1:
+        raise ChunkedUploadError('chunk_size must be at least 1 byte.')
+    sha256 = str(sha256 or '').strip().lower()
+    if sha256 and not SHA256_RE.match(sha256):
+        raise ChunkedUploadError('sha256 must be a hex SHA-256 digest.')
+    upload = ChunkedUpload.objects.create(
+        name=name[:255], size=size, chunk_size=min(chunk_size, settings.UPLOAD_CHUNK_MAX), sha256=sha256,
+    )
+    partial_path(upload).mkdir(parents=True, exist_ok=True)
+    return upload
+
+
+def _chunk_file(upload, index):
+    return partial_path(upload) / f'{index}{CHUNK_SUFFIX}'
+
+
+def received_chunks(upload):
+    try:
+        names = os.listdir(partial_path(upload))
+    except FileNotFoundError:
+        return []
+    return sorted(int(n[:-len(CHUNK_SUFFIX)]) for n in names if n.endswith(CHUNK_SUFFIX))
+
+
+def received_bytes(upload, chunks=None):
+    chunks = received_chunks(upload) if chunks is None else chunks
+    last = upload.chunk_count - 1
+    return sum(upload.size - last * upload.chunk_size if i == last else upload.chunk_size for i in chunks)
+
+
+def write_chunk(upload, offset, stream, encoding=''):
+    """Store the chunk starting at byte ``offset`` of the file. ``stream``
+    is the request body, gzip-compressed when ``encoding`` is ``gzip``.
+    Chunks are written to a scratch file and renamed into place, so a
+    dropped connection never leaves a partial chunk behind and sending a
+    chunk twice is harmless."""
+    if upload.completed_at is not None:
+        raise UploadConflict('Upload is already complete.')
+    try:
+        offset = int(offset)
+    except (TypeError, ValueError):
+        raise ChunkedUploadError('offset must be an integer.')
+    if offset < 0 or offset >= upload.size or offset % upload.chunk_size:
+        raise ChunkedUploadError(f'offset must be a multiple of {upload.chunk_size} below {upload.size}.')
+    encoding = (encoding or 'identity').strip().lower()
+    if encoding not in ('identity', 'gzip'):
+        raise ChunkedUploadError('Content-Encoding must be gzip or identity.')
+
+    index = offset // upload.chunk_size
+    expected = min(upload.chunk_size, upload.size - offset)
+    directory = partial_path(upload)
+    if not directory.is_dir():
+        raise UploadConflict('Upload is no longer open.')
+    scratch = directory / f'.tmp-{uuid.uuid4().hex}'
+    source = gzip.GzipFile(fileobj=stream, mode='rb') if stream is not None and encoding == 'gzip' else stream
+    written = 0
+    try:
+        with open(scratch, 'wb') as out:
+            # Stop one byte past the expected length: enough to reject an
+            # oversized chunk without inflating a gzip bomb.
+            while source is not None and written <= expected:
+                block = source.read(min(COPY_BLOCK, expected + 1 - written))
+                if not block:
+                    break
+                out.write(block)
+                written += len(block)
+        if written != expected:
+            raise ChunkedUploadError(f'Chunk at offset {offset} must be {expected} bytes, got {written}.')
+        os.replace(scratch, _chunk_file(upload, index))
+    except (OSError, EOFError, zlib.error) as e:
+        raise ChunkedUploadError(f'Could not read chunk: {e}')
+    finally:
+        scratch.unlink(missing_ok=True)
+    ChunkedUpload.objects.filter(pk=upload.pk).update(updated_at=timezone.now())
+    return index
+
+
+def assemble(upload):
+    """Concatenate the chunks into one file and return it with its SHA-256.
+    Only one request can assemble an upload at a time; the chunks are
+    removed once the file is complete."""
+    if upload.completed_at is not None:
+        raise UploadConflict('Upload is already complete.')
+    chunks = received_chunks(upload)
+    missing = sorted(set(range(upload.chunk_count)) - set(chunks))
+    if missing:
+        shown = ', '.join(str(i * upload.chunk_size) for i in missing[:10])
+        raise ChunkedUploadError(f'{len(missing)} chunks missing, starting at offsets {shown}.')
+
+    target = partial_root() / f'{upload.id}.csv'
+    hasher = hashlib.new(HASH_ALGORITHM)
+    try:
+        out = open(target, 'xb')
+    except FileExistsError:
+        raise UploadConflict('Upload is already being completed.')
+    try:
+        with out:
+            for index in range(upload.chunk_count):
+                with open(_chunk_file(upload, index), 'rb') as f:
+                    while block := f.read(COPY_BLOCK):
+                        hasher.update(block)
+                        out.write(block)
+    except OSError:
+        target.unlink(missing_ok=True)
+        raise
+    digest = hasher.hexdigest()
+    if upload.sha256 and digest != upload.sha256:
+        # Some chunk is corrupt and there is no telling which: start over.
+        target.unlink(missing_ok=True)
+        shutil.rmtree(partial_path(upload), ignore_errors=True)
+        partial_path(upload).mkdir(parents=True, exist_ok=True)
+        raise ChunkedUploadError('Checksum mismatch; the chunks were discarded, upload them again.')
+    shutil.rmtree(partial_path(upload), ignore_errors=True)
+    return AssembledFile(target, upload.name, upload.size), digest
+
+
+def mark_completed(upload, dataset=None, job=None):
+    upload.dataset = dataset
+    upload.job = job
+    upload.completed_at = timezone.now()
+    upload.save(update_fields=['dataset', 'job', 'completed_at', 'updated_at'])
+
+
+def discard_upload(upload):
+    shutil.rmtree(partial_path(upload), ignore_errors=True)
+    (partial_root() / f'{upload.id}.csv').unlink(missing_ok=True)
+    upload.delete()
+
+
+def prune_uploads(max_age_hours=None):
+    """Drop uploads untouched for UPLOAD_MAX_AGE_HOURS, with their chunks.
+    Completed uploads are kept as long, so a client that missed the
+    response to ``complete`` can still ask for the result."""
+    if max_age_hours is None:
+        max_age_hours = settings.UPLOAD_MAX_AGE_HOURS
+    if not max_age_hours:
+        return 0
+    cutoff = timezone.now() - timedelta(hours=max_age_hours)
+    stale = list(ChunkedUpload.objects.filter(updated_at__lt=cutoff))
+    for upload in stale:
+        discard_upload(upload)
+    if stale:
+        logger.info('Removed %s stale chunked uploads', len(stale))
+    return len(stale)
@@ -0,0 +1,472 @@
+import hashlib
+import json
+import shutil
+import uuid
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .parsing import CSVParser
+
+COLUMNAR_DIR = 'columnar'
+MANIFEST = 'manifest.json'
+# Stores being written live in columnar_root() under this prefix until
+# they are committed.
+SCRATCH_PREFIX = '.tmp-'
+NUMERIC = 'numeric'
+DICTIONARY = 'dictionary'
+TEXT = 'text'
+NUMERIC_DTYPE = 'float64'
+CODE_DTYPE = 'int32'
+OFFSET_DTYPE = 'int64'
+# Rows decoded at a time when a dictionary column is rewritten as text.
+CONVERT_BLOCK_ROWS = 100_000
+
+
+def columnar_root():
+    return Path(settings.MEDIA_ROOT) / COLUMNAR_DIR
+
+
+def store_path(csv_name):
+    return columnar_root() / Path(csv_name).stem
+
+
+def write_strings(data_file, offsets_file, strings, size):
+    """Append ``strings`` as UTF-8 to ``data_file`` and their end offsets
+    (continuing from ``size`` bytes) to ``offsets_file``; returns the new
+    data size."""
+    joined = ''.join(strings)
+    data = joined.encode('utf-8')
+    if len(data) == len(joined):
+        lengths = np.fromiter(map(len, strings), dtype=OFFSET_DTYPE, count=len(strings))
+    else:
+        encoded = [value.encode('utf-8') for value in strings]
+        lengths = np.fromiter(map(len, encoded), dtype=OFFSET_DTYPE, count=len(encoded))
+    data_file.write(data)
+    (np.cumsum(lengths) + size).tofile(offsets_file)
+    return size + len(data)
+
+
+def read_strings(data, ends):
+    """Split ``data`` at the end offsets ``ends`` (relative to its start);
+    empty values come back as None."""
+    out = []
+    prev = 0
+    for end in ends.tolist():
+        out.append(data[prev:end].decode('utf-8') if end > prev else None)
+        prev = end
+    return out
+
+
+class ColumnarWriter:
+    """Writes a dataset column by column while the CSV is being streamed.
+
+    Numeric columns are appended as raw float64 arrays and every other column
+    is dictionary-encoded into int32 codes, so each file can be memory-mapped
+    later without parsing. A column that passes COLUMNAR_MAX_CATEGORIES
+    distinct values (names, ids) is rewritten as text: UTF-8 values in one
+    file and each row's end offset in another, so memory stays bounded by
+    the chunk size. Output goes to a scratch directory until ``commit``
+    moves it next to the stored CSV.
+    """
+
+    def __init__(self):
+        self.path = columnar_root() / f'{SCRATCH_PREFIX}{uuid.uuid4().hex}'
+        self.columns = None
+        self.rows = 0
+        self.files = {}
+        self.data_files = {}
+        self.text_bytes = {}
+        self.lookups = {}
+        # Categories already on disk per column; later ones are appended.
+        self.saved_categories = {}
+        self.in_place = False
+        self.max_categories = settings.COLUMNAR_MAX_CATEGORIES
+        # In-place appends keep replaced files and the previous manifest
+        # until ``release``, so ``abort`` can undo even a committed append.
+        self.created = []
+        self.obsolete = []
+        self.previous_manifest = None
+
+    @classmethod
+    def append_to(cls, store):
+        """Writer that extends an existing store in place. Rows past the
+        manifest's count (left by an aborted append) are truncated first."""
+        writer = cls()
+        writer.path = store.path
+        writer.in_place = True
+        writer.previous_manifest = (store.path / MANIFEST).read_bytes()
+        writer.rows = store.rows
+        writer.columns = [dict(store.specs[name]) for name in store.columns]
+        for spec in writer.columns:
+            col = spec['name']
+            f = open(store.path / spec['file'], 'r+b')
+            f.truncate(store.rows * np.dtype(spec['dtype']).itemsize)
+            f.seek(0, 2)
+            writer.files[col] = f
+            if spec['kind'] == DICTIONARY:
+                categories = store.categories(col)
+                writer.lookups[col] = {str(value): code for code, value in enumerate(categories)}
+                if not spec['categories'].endswith('.npy'):
+                    writer.saved_categories[col] = len(categories)
+            elif spec['kind'] == TEXT:
+                size = int(store.raw(col)[-1]) if store.rows else 0
+                data = open(store.path / spec['data'], 'r+b')
+                data.truncate(size)
+                data.seek(0, 2)
+                writer.data_files[col] = data
+                writer.text_bytes[col] = size
+        return writer
+
+    def update(self, chunk):
+        if self.columns is None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            numeric = set(chunk.select_dtypes(include='number').columns)
+            self.columns = []
+            for i, col in enumerate(chunk.columns):
+                kind = NUMERIC if col in numeric else DICTIONARY
+                spec = {'name': col, 'kind': kind, 'file': f'{i}.bin'}
+                if kind == NUMERIC:
+                    spec['integer'] = True
+                self.columns.append(spec)
+                self.files[col] = open(self.path / f'{i}.bin', 'wb')
+                if kind == DICTIONARY:
+                    self.lookups[col] = {}
+
+        for spec in self.columns:
+            col = spec['name']
+            series = chunk[col]
+            if spec['kind'] == NUMERIC and series.dtype.kind not in 'iuf':
+                # Text in a later chunk makes the whole column text, as
+                # read_csv would have parsed it from the whole file.
+                self._to_dictionary(spec, self.rows)
+            if spec['kind'] == NUMERIC:
+                if series.dtype.kind not in 'iu':
+                    spec['integer'] = False
+                values = series.to_numpy(dtype=NUMERIC_DTYPE, na_value=np.nan)
+            elif spec['kind'] == TEXT:
+                self._write_text(col, series)
+                continue
+            else:
+                values = self._encode(col, series)
+            values.tofile(self.files[col])
+            if spec['kind'] == DICTIONARY and len(self.lookups[col]) > self.max_categories:
+                self._to_text(spec, self.rows + len(chunk))
+        self.rows += len(chunk)
+
+    def _encode(self, col, series):
+        lookup = self.lookups[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Parsed as categorical: translate the chunk's categories once
+            # instead of hashing every row.
+            categories = series.cat.categories.astype(str)
+            for value in categories:
+                if value not in lookup:
+                    lookup[value] = len(lookup)
+            table = np.array([lookup[value] for value in categories], dtype=CODE_DTYPE)
+            codes = series.cat.codes.to_numpy()
+            out = np.full(len(series), -1, dtype=CODE_DTYPE)
+            out[codes >= 0] = table[codes[codes >= 0]]
+            return out
+        mask = series.isna().to_numpy()
+        present = series[~mask].astype(str)
+        for value in pd.unique(present):
+            if value not in lookup:
+                lookup[value] = len(lookup)
+        codes = np.full(len(series), -1, dtype=CODE_DTYPE)
+        codes[~mask] = present.map(lookup).to_numpy(dtype=CODE_DTYPE)
+        return codes
+
+    def _write_text(self, col, series):
+        mask = series.isna().to_numpy()
+        strings = series.astype(str).to_numpy(dtype=object)
+        # The CSV reader turns empty fields into NaN, so an empty value can
+        # stand for a missing one.
+        strings[mask] = ''
+        self._append_text(col, strings)
+
+    def _append_text(self, col, strings):
+        self.text_bytes[col] = write_strings(self.data_files[col], self.files[col], strings, self.text_bytes[col])
+
+    def _to_dictionary(self, spec, rows):
+        """Rewrite a numeric column's first ``rows`` values as dictionary
+        codes of their text and continue it as a dictionary column."""
+        col = spec['name']
+        values_file = self.path / spec['file']
+        self.files.pop(col).close()
+        integer = spec.pop('integer', False)
+        spec.update({'kind': DICTIONARY, 'file': f'{Path(spec["file"]).stem}.codes'})
+        self.created.append(self.path / spec['file'])
+        self.files[col] = open(self.path / spec['file'], 'wb')
+        self.lookups[col] = {}
+        with open(values_file, 'rb') as f:
+            for _ in range(0, rows, CONVERT_BLOCK_ROWS):
+                values = pd.Series(np.fromfile(f, dtype=NUMERIC_DTYPE, count=CONVERT_BLOCK_ROWS))
+                if integer:
+                    values = values.astype('int64')
+                self._encode(col, values).tofile(self.files[col])
+        if self.in_place:
+            self.obsolete.append(values_file)
+        else:
+            values_file.unlink()
+
+    def _to_text(self, spec, rows):
+        """Rewrite a dictionary column's first ``rows`` codes as text and
+        continue it as a text column."""
+        col = spec['name']
+        codes_file = self.path / spec['file']
+        self.files.pop(col).close()
+        categories = np.array(list(self.lookups.pop(col)), dtype=object)
+        stem = Path(spec['file']).stem
+        stale = [codes_file]
+        for key in ('categories', 'categories_data'):
+            if key in spec:
+                stale.append(self.path / spec.pop(key))
+        spec.update({'kind': TEXT, 'file': f'{stem}.offsets', 'data': f'{stem}.text'})
+        for name in (spec['file'], spec['data']):
+            self.created.append(self.path / name)
+        self.files[col] = open(self.path / spec['file'], 'wb')
+        self.data_files[col] = open(self.path / spec['data'], 'wb')
+        self.text_bytes[col] = 0
+        with open(codes_file, 'rb') as f:
+            for _ in range(0, rows, CONVERT_BLOCK_ROWS):
+                codes = np.fromfile(f, dtype=CODE_DTYPE, count=CONVERT_BLOCK_ROWS)
+                strings = np.full(len(codes), '', dtype=object)
+                strings[codes >= 0] = categories[codes[codes >= 0]]
+                self._append_text(col, strings)
+        if self.in_place:
+            self.obsolete.extend(stale)
+        else:
+            codes_file.unlink()
+
+    def _finish(self):
+        for f in [*self.files.values(), *self.data_files.values()]:
+            f.close()
+        self.files = {}
+        self.data_files = {}
+        for i, spec in enumerate(self.columns):
+            if spec['kind'] == NUMERIC:
+                spec['dtype'] = NUMERIC_DTYPE
+            elif spec['kind'] == TEXT:
+                spec['dtype'] = OFFSET_DTYPE
+            else:
+                spec['dtype'] = CODE_DTYPE
+                self._save_categories(spec, i)
+        manifest = {'version': 1, 'rows': self.rows, 'columns': self.columns}
+        self._write_manifest(json.dumps(manifest).encode('utf-8'))
+
+    def _write_manifest(self, data):
+        tmp = self.path / f'.{MANIFEST}'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        tmp.replace(self.path / MANIFEST)
+
+    def _drop_cached(self):
+        # Derived results describe the rows they were computed from.
+        for cached in self.path.glob('*-*.json'):
+            cached.unlink(missing_ok=True)
+
+    def _save_categories(self, spec, i):
+        """Append the categories added since the store was opened. Codes
+        are positions, so the stored ones never change; stores written with
+        a .npy categories array move to this layout on their next append."""
+        col = spec['name']
+        saved = self.saved_categories.get(col, 0)
+        if spec.get('categories', '').endswith('.npy'):
+            self.obsolete.append(self.path / spec['categories'])
+        spec['categories'] = f'{i}.categories'
+        spec['categories_data'] = f'{i}.categories.text'
+        offsets_path = self.path / spec['categories']
+        data_path = self.path / spec['categories_data']
+        mode = 'ab' if saved else 'wb'
+        if saved:
+            # Drop anything past the last saved category (an interrupted commit).
+            itemsize = np.dtype(OFFSET_DTYPE).itemsize
+            with open(offsets_path, 'r+b') as f:
+                f.truncate(saved * itemsize)
+            size = int(np.fromfile(offsets_path, dtype=OFFSET_DTYPE, count=1, offset=(saved - 1) * itemsize)[0])
+            with open(data_path, 'r+b') as f:
+                f.truncate(size)
+        else:
+            size = 0
+        new = np.array(list(islice(self.lookups[col], saved, None)), dtype=object)
+        with open(data_path, mode) as data_file, open(offsets_path, mode) as offsets_file:
+            write_strings(data_file, offsets_file, new, size)
+        self.saved_categories[col] = len(self.lookups[col])
+
+    def commit(self, csv_name):
+        """Publish the store. An in-place append can still be undone with
+        ``abort`` until ``release`` drops the files it replaced."""
+        if self.columns is None:
+            return None
+        self._finish()
+        if self.in_place:
+            self._drop_cached()
+            return self.path
+        target = store_path(csv_name)
+        if target.exists():
+            shutil.rmtree(target)
+        self.path.rename(target)
+        return target
+
+    def release(self):
+        for path in self.obsolete:
+            path.unlink(missing_ok=True)
+        self.obsolete = []
+        self.previous_manifest = None
+
+    def abort(self):
+        for f in [*self.files.values(), *self.data_files.values()]:
+            f.close()
+        self.files = {}
+        self.data_files = {}
+        if self.in_place:
+            if self.previous_manifest is not None:
+                # Rows past the restored count are cut off by the next append.
+                self._write_manifest(self.previous_manifest)
+                self._drop_cached()
+            for path in self.created:
+                path.unlink(missing_ok=True)
+        else:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+
+class ColumnarStore:
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / MANIFEST, encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.rows = manifest['rows']
+        self.specs = {spec['name']: spec for spec in manifest['columns']}
+        self.columns = [spec['name'] for spec in manifest['columns']]
+        self._categories = {}
+
+    def __len__(self):
+        return self.rows
+
+    def is_numeric(self, name):
+        return self.specs[name]['kind'] == NUMERIC
+
+    def is_text(self, name):
+        return self.specs[name]['kind'] == TEXT
+
+    def _map(self, spec):
+        if not self.rows:
+            return np.empty(0, dtype=spec['dtype'])
+        return np.memmap(self.path / spec['file'], dtype=spec['dtype'], mode='r', shape=(self.rows,))
+
+    def categories(self, name):
+        if name not in self._categories:
+            spec = self.specs[name]
+            if spec['categories'].endswith('.npy'):
+                self._categories[name] = np.load(self.path / spec['categories'], mmap_mode='r')
+            else:
+                ends = np.fromfile(self.path / spec['categories'], dtype=OFFSET_DTYPE)
+                data = (self.path / spec['categories_data']).read_bytes()
+                self._categories[name] = np.array(read_strings(data, ends), dtype=object)
+        return self._categories[name]
+
+    def raw(self, name):
+        """Zero-copy view of a column: float64 values, int32 codes (-1 for
+        missing) for dictionary-encoded columns, or int64 end offsets into
+        the UTF-8 data for text columns."""
+        return self._map(self.specs[name])
+
+    def _text_values(self, name, start, stop):
+        start, stop, _ = slice(start, stop).indices(self.rows)
+        if start >= stop:
+            return []
+        offsets = self.raw(name)
+        begin = int(offsets[start - 1]) if start else 0
+        ends = np.asarray(offsets[start:stop]) - begin
+        with open(self.path / self.specs[name]['data'], 'rb') as f:
+            f.seek(begin)
+            data = f.read(int(ends[-1]))
+        return read_strings(data, ends)
+
+    def column(self, name, start=0, stop=None):
+        if self.is_text(name):
+            return pd.Series(self._text_values(name, start, stop), name=name, dtype=object)
+        values = self.raw(name)[start:stop]
+        if self.is_numeric(name):
+            return pd.Series(values, name=name, copy=False)
+        categories = self.categories(name)
+        return pd.Series(pd.Categorical.from_codes(np.asarray(values), categories=categories), name=name)
+
+    def values(self, name, start=0, stop=None):
+        """Plain Python values for a row range; touches only that slice of
+        the column."""
+        if self.is_text(name):
+            return self._text_values(name, start, stop)
+        raw = np.asarray(self.raw(name)[start:stop])
+        if self.is_numeric(name):
+            cast = int if self.specs[name].get('integer') else float
+            return [None if np.isnan(v) else cast(v) for v in raw.tolist()]
+        categories = self.categories(name)
+        present = raw >= 0
+        decoded = np.empty(len(raw), dtype=object)
+        decoded[present] = categories[raw[present]]
+        return [None if not ok else str(v) for ok, v in zip(present, decoded)]
+
+    def records(self, columns=None, start=0, stop=None):
+        columns = self.columns if columns is None else columns
+        data = [self.values(name, start, stop) for name in columns]
+        return [dict(zip(columns, row)) for row in zip(*data)]
+
+    def frame(self, columns=None, start=0, stop=None):
+        columns = self.columns if columns is None else columns
+        return pd.DataFrame({name: self.column(name, start, stop) for name in columns})
+
+    def cache_path(self, kind, params):
+        key = hashlib.sha1(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+        return self.path / f'{kind}-{key}.json'
+
+    def is_cached(self, kind, params):
+        return self.cache_path(kind, params).exists()
+
+    def cached(self, kind, params, compute):
+        """Return a derived JSON result, computing it once and keeping it in
+        the store directory until rows are appended to the store."""
+        path = self.cache_path(kind, params)
+        if path.exists():
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        result = compute()
+        tmp = path.with_name(f'.{path.name}.{uuid.uuid4().hex}')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        tmp.replace(path)
+        return result
+
+
+def open_store(csv_name):
+    path = store_path(csv_name)
+    if not (path / MANIFEST).exists():
+        return None
+    return ColumnarStore(path)
+
+
+def dataset_store(dataset):
+    """Columnar store for a dataset, building it on first use for datasets
+    ingested before stores existed."""
+    store = open_store(dataset.csv_file.name)
+    if store is None:
+        build_store(dataset.csv_file)
+        store = open_store(dataset.csv_file.name)
+    return store
+
+
+def build_store(csv_file, chunk_rows=None):
+    writer = ColumnarWriter()
+    try:
+        with csv_file.open('rb') as f:
+            for chunk in CSVParser(chunk_rows).chunks(f):
+                chunk.columns = [c.strip() for c in chunk.columns]
+                writer.update(chunk)
+        return writer.commit(csv_file.name)
+    except BaseException:
+        writer.abort()
+        raise
@@ -0,0 +1,110 @@
+import numpy as np
+
+from .columnar import open_store
+from .ingest import combined_sketch_summary
+from .jobs import get_stats_executor, run_dataset_stats
+from .stats import group_stats
+
+COMPARE_METRICS = ['count', 'mean', 'min', 'max', 'std', 'p50']
+
+
+class CompareError(ValueError):
+    pass
+
+
+def parse_ids(raw, limit):
+    if not raw:
+        raise CompareError('ids is required, e.g. ?ids=1,2,3.')
+    ids = []
+    for part in (p.strip() for p in raw.split(',')):
+        if not part:
+            continue
+        try:
+            pk = int(part)
+        except ValueError:
+            raise CompareError(f'Invalid dataset id "{part}".')
+        if pk not in ids:
+            ids.append(pk)
+    if len(ids) < 2:
+        raise CompareError('Pass at least two dataset ids.')
+    if len(ids) > limit:
+        raise CompareError(f'At most {limit} datasets can be compared.')
+    return ids
+
+
+def overall_stats(datasets):
+    """Overall column statistics per dataset id. Cached results are read
+    directly; the rest are computed on the COMPARE_WORKERS stats pool, so
+    the wait is about the slowest dataset per round of COMPARE_WORKERS."""
+    results = {}
+    pending = {}
+    for dataset in datasets:
+        store = open_store(dataset.csv_file.name)
+        if store is not None and store.is_cached('stats', [None, COMPARE_METRICS]):
+            results[dataset.id] = group_stats(store, None, COMPARE_METRICS)
+        else:
+            pending[dataset.id] = get_stats_executor().submit(run_dataset_stats, dataset.id, None, COMPARE_METRICS)
+    for pk, future in pending.items():
+        results[pk] = future.result()
+    return {pk: result['overall']['columns'] for pk, result in results.items()}
+
+
+def _trend(values):
+    points = [(i, v) for i, v in enumerate(values) if v is not None]
+    if len(points) < 2:
+        return None
+    x, y = np.array(points, dtype=np.float64).T
+    slope = float(np.polyfit(x, y, 1)[0])
+    return {'slope': round(slope, 4), 'change': round(float(y[-1] - y[0]), 2)}
+
+
+def compare(datasets):
+    """Side-by-side view of datasets in upload order: per-column averages
+    with deltas and a linear trend, type mix shares, overall statistics and
+    quantiles/distinct counts merged across all of them."""
+    datasets = sorted(datasets, key=lambda d: (d.uploaded_at, d.id))
+    stats = overall_stats(datasets)
+
+    columns = []
+    types = []
+    for dataset in datasets:
+        columns += [c for c in dataset.summary.get('averages', {}) if c not in columns]
+        types += [t for t in dataset.summary.get('type_distribution', {}) if t not in types]
+
+    averages = {}
+    deltas = {}
+    trends = {}
+    for col in columns:
+        values = [d.summary.get('averages', {}).get(col) for d in datasets]
+        averages[col] = values
+        deltas[col] = [
+            None if prev is None or cur is None else round(cur - prev, 2)
+            for prev, cur in zip(values, values[1:])
+        ]
+        trends[col] = _trend(values)
+
+    type_mix = {}
+    for t in types:
+        shares = []
+        for d in datasets:
+            total = d.summary.get('total_count') or 0
+            count = d.summary.get('type_distribution', {}).get(t, 0)
+            shares.append(round(count / total, 4) if total else None)
+        type_mix[t] = shares
+
+    return {
+        'datasets': [
+            {'id': d.id, 'name': d.name, 'uploaded_at': d.uploaded_at, 'total_count': d.summary.get('total_count')}
+            for d in datasets
+        ],
+        'columns': columns,
+        'averages': averages,
+        'deltas': deltas,
+        'trend': trends,
+        'type_mix': type_mix,
+        'stats': [stats[d.id] for d in datasets],
+        'combined': {
+            'total_count': sum(d.summary.get('total_count') or 0 for d in datasets),
+            **combined_sketch_summary([d.stats_state or {} for d in datasets]),
+        },
+    }
@@ -0,0 +1,84 @@
+import gzip
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.cache import patch_vary_headers
+
+from .timing import phase
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_SIZE = 200
+BROTLI_QUALITY = 5
+GZIP_LEVEL = 6
+# Already compressed or served as files; recompressing wastes CPU.
+SKIP_TYPES = ('application/pdf', 'image/')
+_accepts_br = re.compile(r'\bbr\b')
+_accepts_gzip = re.compile(r'\bgzip\b')
+
+
+def _encoding_for(request):
+    accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if brotli is not None and _accepts_br.search(accepted):
+        return 'br'
+    if _accepts_gzip.search(accepted):
+        return 'gzip'
+    return None
+
+
+def _compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """Brotli (when installed) or gzip for buffered responses, chosen from
+    Accept-Encoding. Streaming responses such as report PDFs pass through.
+    Like Django's GZipMiddleware, strong ETags become weak, since the bytes
+    on the wire now depend on the encoding."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process(request, await self.get_response(request))
+
+    def process(self, request, response):
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or response.get('Content-Type', '').startswith(SKIP_TYPES)
+            or len(response.content) < MIN_SIZE
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = _encoding_for(request)
+        if encoding is None:
+            return response
+        with phase('compress'):
+            compressed = _compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,411 @@
+import math
+import os
+import shutil
+
+import pandas as pd
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .columnar import ColumnarWriter, dataset_store, store_path
+from .models import Dataset
+from .parsing import CSVParser
+from .reports import discard_report
+from .sketches import HyperLogLog, KLLSketch
+from .timing import phase, phase_seconds, record_ingest
+
+TYPE_COLUMN_CANDIDATES = ['Type', 'type', 'Equipment Type', 'equipment_type']
+NAME_COLUMN_CANDIDATES = ['Equipment Name', 'equipment_name', 'Name', 'name']
+PREVIEW_ROWS = 10
+SUMMARY_QUANTILES = [('p5', 0.05), ('p25', 0.25), ('p50', 0.5), ('p75', 0.75), ('p95', 0.95)]
+
+
+def _find_column(columns, candidates):
+    for candidate in candidates:
+        if candidate in columns:
+            return candidate
+    return None
+
+
+def find_type_column(columns):
+    return _find_column(columns, TYPE_COLUMN_CANDIDATES)
+
+
+def find_name_column(columns):
+    return _find_column(columns, NAME_COLUMN_CANDIDATES)
+
+
+def _as_text(value):
+    return value if isinstance(value, str) else str(value)
+
+
+class SummaryBuilder:
+    """Accumulates the dataset summary one DataFrame chunk at a time.
+
+    Only running totals are kept between chunks, so memory stays bounded by
+    the chunk size rather than by the size of the file. The totals are
+    mergeable (count, sum and M2 per column, plus type tallies), so a builder
+    restored with ``from_state`` can take appended rows without re-reading
+    the earlier ones.
+    """
+
+    STATE_VERSION = 2
+
+    def __init__(self):
+        self.columns = None
+        self.type_col = None
+        self.total_count = 0
+        self.sums = {}
+        self.counts = {}
+        self.m2 = {}
+        self.non_numeric = set()
+        self.float_cols = set()
+        self.type_counts = {}
+        self.preview = None
+        self.quantile_sketches = {}
+        self.distinct_sketches = {}
+
+    def update(self, chunk):
+        chunk.columns = [c.strip() for c in chunk.columns]
+        if self.columns is None:
+            self.columns = chunk.columns.tolist()
+            self.type_col = find_type_column(self.columns)
+            for col in (find_name_column(self.columns), self.type_col):
+                if col:
+                    self.distinct_sketches[col] = HyperLogLog()
+
+        self.total_count += int(len(chunk))
+
+        numeric_cols = set(chunk.select_dtypes(include='number').columns)
+        for col in self.columns:
+            if col not in numeric_cols:
+                self.non_numeric.add(col)
+                self.quantile_sketches.pop(col, None)
+                continue
+            if col in self.non_numeric:
+                continue
+            series = chunk[col]
+            if series.dtype.kind == 'f':
+                self.float_cols.add(col)
+            self._merge_moments(col, int(series.count()), series.sum().item(), series.var(ddof=0))
+            self.quantile_sketches.setdefault(col, KLLSketch()).update(series.to_numpy(dtype='float64', na_value=math.nan))
+
+        for col, sketch in self.distinct_sketches.items():
+            sketch.update(chunk[col])
+
+        if self.type_col:
+            counts = chunk[self.type_col].astype(str).value_counts(dropna=False, sort=False)
+            for key, value in counts.items():
+                self.type_counts[key] = self.type_counts.get(key, 0) + int(value)
+
+        if self.preview is None:
+            self.preview = chunk.head(PREVIEW_ROWS)
+        elif len(self.preview) < PREVIEW_ROWS:
+            self.preview = pd.concat([self.preview, chunk.head(PREVIEW_ROWS - len(self.preview))])
+
+    def _merge_moments(self, col, n_b, sum_b, var_b):
+        # Chan et al. pairwise update of the sum of squared deviations.
+        n_a = self.counts.get(col, 0)
+        sum_a = self.sums.get(col, 0)
+        m2_a = self.m2.get(col, 0.0)
+        m2_b = float(var_b) * n_b if n_b else 0.0
+        if n_a and n_b:
+            delta = sum_b / n_b - sum_a / n_a
+            m2_a += m2_b + delta * delta * n_a * n_b / (n_a + n_b)
+        else:
+            m2_a += m2_b
+        self.sums[col] = sum_a + sum_b
+        self.counts[col] = n_a + n_b
+        self.m2[col] = m2_a
+
+    def numeric_columns(self):
+        return [col for col in self.columns or [] if col in self.sums and col not in self.non_numeric]
+
+    def mean(self, col):
+        count = self.counts.get(col, 0)
+        return self.sums[col] / count if count else math.nan
+
+    def variance(self, col):
+        count = self.counts.get(col, 0)
+        return self.m2[col] / (count - 1) if count > 1 else math.nan
+
+    def state(self):
+        return {
+            'version': self.STATE_VERSION,
+            'columns': self.columns,
+            'type_col': self.type_col,
+            'total_count': self.total_count,
+            'sums': self.sums,
+            'counts': self.counts,
+            'm2': self.m2,
+            'non_numeric': sorted(self.non_numeric),
+            'float_cols': sorted(self.float_cols),
+            'type_counts': self.type_counts,
+            'quantile_sketches': {col: sk.to_dict() for col, sk in self.quantile_sketches.items()},
+            'distinct_sketches': {col: sk.to_dict() for col, sk in self.distinct_sketches.items()},
+        }
+
+    @classmethod
+    def from_state(cls, state, preview=()):
+        builder = cls()
+        builder.columns = state['columns']
+        builder.type_col = state['type_col']
+        builder.total_count = state['total_count']
+        builder.sums = dict(state['sums'])
+        builder.counts = dict(state['counts'])
+        builder.m2 = dict(state['m2'])
+        builder.non_numeric = set(state['non_numeric'])
+        builder.float_cols = set(state['float_cols'])
+        builder.type_counts = dict(state['type_counts'])
+        builder.quantile_sketches = {
+            col: KLLSketch.from_dict(data) for col, data in state['quantile_sketches'].items()
+        }
+        builder.distinct_sketches = {
+            col: HyperLogLog.from_dict(data) for col, data in state['distinct_sketches'].items()
+        }
+        if builder.columns is not None:
+            builder.preview = pd.DataFrame(list(preview), columns=builder.columns)
+        return builder
+
+    def result(self):
+        averages = {col: round(float(self.mean(col)), 2) for col in self.numeric_columns()}
+
+        # type_counts is in first-seen order, which is what value_counts()
+        # sorts; sorting it the same way gives the same order for ties.
+        type_dist = pd.Series(self.type_counts, dtype='int64').sort_values(ascending=False).to_dict()
+
+        preview = self.preview if self.preview is not None else pd.DataFrame()
+        # A column that only picks up NaNs in a later chunk is float overall.
+        promoted = {
+            col: 'float64' for col in self.float_cols
+            if col in preview.columns and preview[col].dtype.kind in 'iu'
+        }
+        if promoted:
+            preview = preview.astype(promoted)
+        # One that picks up text is text overall, as read_csv would have
+        # parsed it from the whole file: numbers from earlier chunks become
+        # strings too.
+        texts = [col for col in preview.columns if col in self.non_numeric and col in self.sums]
+        if texts:
+            preview = preview.assign(**{col: preview[col].map(_as_text, na_action='ignore') for col in texts})
+
+        return {
+            'total_count': self.total_count,
+            'averages': averages,
+            'type_distribution': type_dist,
+            'columns': list(self.columns or []),
+            'preview': preview.to_dict(orient='records'),
+            'quantiles': self.quantile_summary(),
+            'distinct_counts': {col: sk.estimate() for col, sk in self.distinct_sketches.items()},
+        }
+
+    def quantile_summary(self):
+        """Approximate percentiles per numeric column from the KLL sketches."""
+        names = [name for name, _ in SUMMARY_QUANTILES]
+        qs = [q for _, q in SUMMARY_QUANTILES]
+        out = {}
+        for col in self.numeric_columns():
+            sketch = self.quantile_sketches.get(col)
+            if sketch is None or not sketch.n:
+                continue
+            out[col] = {name: round(value, 2) for name, value in zip(names, sketch.quantiles(qs))}
+        return out
+
+
+def combined_sketch_summary(states):
+    """Quantiles and distinct counts across several datasets, merged from
+    their stored sketches without touching the underlying rows."""
+    quantile_sketches = {}
+    distinct_sketches = {}
+    for state in states:
+        for col, data in state.get('quantile_sketches', {}).items():
+            sketch = KLLSketch.from_dict(data)
+            if col in quantile_sketches:
+                quantile_sketches[col].merge(sketch)
+            else:
+                quantile_sketches[col] = sketch
+        for col, data in state.get('distinct_sketches', {}).items():
+            sketch = HyperLogLog.from_dict(data)
+            if col in distinct_sketches:
+                distinct_sketches[col].merge(sketch)
+            else:
+                distinct_sketches[col] = sketch
+    names = [name for name, _ in SUMMARY_QUANTILES]
+    qs = [q for _, q in SUMMARY_QUANTILES]
+    return {
+        'quantiles': {
+            col: {name: round(value, 2) for name, value in zip(names, sk.quantiles(qs))}
+            for col, sk in quantile_sketches.items() if sk.n
+        },
+        'distinct_counts': {col: sk.estimate() for col, sk in distinct_sketches.items()},
+    }
+
+
+def _stream_size(fileobj):
+    try:
+        pos = fileobj.tell()
+        fileobj.seek(0, os.SEEK_END)
+        size = fileobj.tell()
+        fileobj.seek(pos)
+        return size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def summarize_csv(fileobj, chunk_rows=None, progress=None, consumers=(), builder=None, parser=None):
+    if parser is None:
+        parser = CSVParser(chunk_rows)
+    if builder is None:
+        builder = SummaryBuilder()
+    size = _stream_size(fileobj) if progress and parser.chunk_rows else None
+    chunks = parser.chunks(fileobj)
+    while True:
+        with phase('parse'):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        with phase('aggregate'):
+            builder.update(chunk)
+        with phase('columnar'):
+            for consumer in consumers:
+                consumer.update(chunk)
+        if size:
+            progress(min(fileobj.tell() / size, 1.0))
+    if progress:
+        progress(1.0)
+    with phase('aggregate'):
+        return builder.result()
+
+
+def save_dataset(name, csv_file, summary, content_hash='', file_size=0, stats_state=None, parse_stats=None):
+    return Dataset.objects.create(
+        name=name,
+        csv_file=csv_file,
+        summary=summary,
+        content_hash=content_hash,
+        file_size=file_size,
+        stats_state=stats_state or {},
+        parse_stats=parse_stats or {},
+    )
+
+
+def find_duplicate(content_hash):
+    if not content_hash:
+        return None
+    return Dataset.objects.filter(content_hash=content_hash).exclude(csv_file='').first()
+
+
+def save_duplicate(name, original):
+    # Identical bytes: share the stored file and summary instead of re-parsing.
+    return save_dataset(
+        name,
+        original.csv_file.name,
+        original.summary,
+        original.content_hash,
+        original.file_size,
+        original.stats_state,
+        original.parse_stats,
+    )
+
+
+class AppendError(ValueError):
+    pass
+
+
+def _detach_shared_file(dataset):
+    # Deduplicated uploads share one CSV and store; give this dataset its own
+    # copy before changing it. Returns whether a copy was made.
+    if not Dataset.objects.filter(csv_file=dataset.csv_file.name).exclude(pk=dataset.pk).exists():
+        return False
+    old_name = dataset.csv_file.name
+    with dataset.csv_file.open('rb') as f:
+        dataset.csv_file.save(os.path.basename(old_name), File(f), save=False)
+    if store_path(old_name).exists():
+        shutil.copytree(store_path(old_name), store_path(dataset.csv_file.name))
+    return True
+
+
+def _read_header(uploaded_file):
+    uploaded_file.seek(0)
+    header = [c.strip() for c in pd.read_csv(uploaded_file, nrows=0).columns]
+    uploaded_file.seek(0)
+    return header
+
+
+def _append_csv_rows(path, uploaded_file):
+    uploaded_file.seek(0)
+    uploaded_file.readline()
+    with open(path, 'r+b') as out:
+        out.seek(0, os.SEEK_END)
+        if out.tell():
+            out.seek(-1, os.SEEK_END)
+            if out.read(1) != b'\n':
+                out.write(b'\n')
+        shutil.copyfileobj(uploaded_file, out)
+        return out.tell()
+
+
+def append_rows(dataset, uploaded_file):
+    """Add the rows of ``uploaded_file`` (a CSV with the same header) to a
+    dataset. The summary is updated from the stored mergeable state, so the
+    cost depends on the new rows, not on what is already stored.
+
+    Appends to a dataset run one at a time: the transaction writes the
+    dataset row before reading it, which takes the row lock (the database
+    write lock on SQLite, where ``select_for_update`` does nothing). The
+    CSV and columnar store change inside the transaction and are put back
+    if it fails.
+    """
+    try:
+        header = _read_header(uploaded_file)
+    except Exception as e:
+        raise AppendError(f'Invalid CSV: {e}')
+
+    writer = None
+    detached = False
+    csv_size = None
+    try:
+        with transaction.atomic():
+            Dataset.objects.filter(pk=dataset.pk).update(updated_at=timezone.now())
+            dataset = Dataset.objects.get(pk=dataset.pk)
+            if header != dataset.summary.get('columns'):
+                raise AppendError('Columns must match the dataset: ' + ', '.join(dataset.summary.get('columns', [])))
+            detached = _detach_shared_file(dataset)
+
+            if dataset.stats_state.get('version') == SummaryBuilder.STATE_VERSION:
+                builder = SummaryBuilder.from_state(dataset.stats_state, dataset.summary.get('preview', []))
+            else:
+                # Datasets from before the current state format: rebuild it once.
+                builder = SummaryBuilder()
+                with dataset.csv_file.open('rb') as f:
+                    summarize_csv(f, builder=builder)
+
+            rows_before = builder.total_count
+            writer = ColumnarWriter.append_to(dataset_store(dataset))
+            parser = CSVParser()
+            try:
+                summarize_csv(uploaded_file, consumers=[writer], builder=builder, parser=parser)
+            except Exception as e:
+                raise AppendError(f'Invalid CSV: {e}')
+            csv_size = os.path.getsize(dataset.csv_file.path)
+            dataset.file_size = _append_csv_rows(dataset.csv_file.path, uploaded_file)
+
+            dataset.summary = builder.result()
+            dataset.stats_state = builder.state()
+            dataset.parse_stats = parser.stats(dataset.parse_stats)
+            dataset.content_hash = ''
+            dataset.save()
+            writer.commit(dataset.csv_file.name)
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        if detached:
+            shutil.rmtree(store_path(dataset.csv_file.name), ignore_errors=True)
+            dataset.csv_file.delete(save=False)
+        elif csv_size is not None:
+            os.truncate(dataset.csv_file.path, csv_size)
+        raise
+    writer.release()
+    discard_report(dataset.id)
+    record_ingest(uploaded_file.size, builder.total_count - rows_before, phase_seconds('parse', 'aggregate'))
+    return dataset
@@ -0,0 +1,248 @@
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.utils import timezone
+
+from .chunked import prune_uploads
+from .columnar import ColumnarWriter, dataset_store
+from .ingest import SummaryBuilder, save_dataset, summarize_csv
+from .models import Dataset, IngestJob
+from .parsing import CSVParser
+from .records import copy_records, load_records, loaded_rows
+from .retention import prune, prune_scratch
+from .stats import group_stats
+from .timing import record_ingest
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_stats_executor = None
+_thread_executor = None
+_thread_slots = None
+_retention_future = None
+_records_futures = {}
+_records_again = {}
+_records_lock = threading.Lock()
+_retention_timer = None
+_retention_lock = threading.Lock()
+
+
+def _init_worker():
+    import django
+    django.setup()
+    # Forked workers must not share the parent's database connections.
+    connections.close_all()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.INGEST_WORKERS,
+                initializer=_init_worker,
+            )
+        return _executor
+
+
+def get_stats_executor():
+    """Pool for the per-dataset statistics behind /compare/, kept apart from
+    ingest and retention so a compare never waits behind a large upload."""
+    global _stats_executor
+    with _executor_lock:
+        if _stats_executor is None:
+            _stats_executor = ProcessPoolExecutor(
+                max_workers=settings.COMPARE_WORKERS,
+                initializer=_init_worker,
+            )
+        return _stats_executor
+
+
+class Overloaded(Exception):
+    """More blocking work is queued than ASYNC_MAX_PENDING allows."""
+
+
+def get_thread_executor():
+    global _thread_executor, _thread_slots
+    with _executor_lock:
+        if _thread_executor is None:
+            _thread_executor = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_WORKER_THREADS, thread_name_prefix='chemflux-async',
+            )
+            _thread_slots = threading.BoundedSemaphore(settings.ASYNC_MAX_PENDING)
+        return _thread_executor
+
+
+async def run_bounded(fn, *args):
+    """Run blocking work such as report rendering on a small thread pool
+    from an async view, so the event loop keeps serving other connections
+    meanwhile. At most ASYNC_MAX_PENDING calls may be running or waiting;
+    past that this raises Overloaded instead of queueing without bound.
+    ``fn`` must not touch the database: Django ties connections to the
+    threads that sync_to_async manages."""
+    executor = get_thread_executor()
+    if not _thread_slots.acquire(blocking=False):
+        raise Overloaded()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(fn, *args))
+    finally:
+        _thread_slots.release()
+
+
+def _update_job(job_id, **fields):
+    IngestJob.objects.filter(pk=job_id).update(updated_at=timezone.now(), **fields)
+
+
+def run_ingest_job(job_id):
+    close_old_connections()
+    job = IngestJob.objects.get(pk=job_id)
+    _update_job(job_id, status=IngestJob.RUNNING)
+
+    def report(fraction):
+        _update_job(job_id, progress=round(fraction, 3))
+
+    builder = SummaryBuilder()
+    writer = ColumnarWriter()
+    parser = CSVParser()
+    try:
+        with job.csv_file.open('rb') as f:
+            summary = summarize_csv(f, progress=report, consumers=[writer], builder=builder, parser=parser)
+        dataset = save_dataset(
+            job.name, job.csv_file.name, summary, job.content_hash, job.csv_file.size, builder.state(),
+            parser.stats(),
+        )
+    except Exception as e:
+        logger.exception('Ingest job %s failed', job_id)
+        writer.abort()
+        job.csv_file.delete(save=False)
+        _update_job(job_id, status=IngestJob.FAILED, error=str(e))
+        return None
+    try:
+        writer.commit(dataset.csv_file.name)
+    except Exception as e:
+        # The dataset is saved and owns the upload now; its store is rebuilt
+        # from the CSV on first use.
+        logger.exception('Ingest job %s could not write the columnar store', job_id)
+        writer.abort()
+        _update_job(job_id, status=IngestJob.FAILED, error=str(e), dataset=dataset)
+        return None
+
+    _update_job(job_id, status=IngestJob.DONE, progress=1.0, dataset=dataset)
+    return dataset.id
+
+
+def _on_job_done(job_id, future):
+    exc = future.exception()
+    if exc is not None:
+        # The worker died before it could record the failure itself.
+        _update_job(job_id, status=IngestJob.FAILED, error=str(exc) or repr(exc))
+    elif future.result() is not None:
+        size, rows = Dataset.objects.filter(pk=future.result()).values_list('file_size', 'summary__total_count').get()
+        record_ingest(size, rows or 0)
+        schedule_records(future.result())
+        schedule_retention()
+
+
+def submit_ingest_job(name, uploaded_file, content_hash=''):
+    job = IngestJob.objects.create(name=name, csv_file=uploaded_file, content_hash=content_hash)
+    future = get_executor().submit(run_ingest_job, job.id)
+    future.add_done_callback(lambda f: _on_job_done(job.id, f))
+    return job
+
+
+def run_load_records(dataset_id, source_id=None):
+    """Load a dataset's EquipmentRecords, copying what ``source_id`` (the
+    dataset it was deduplicated against) already has first."""
+    close_old_connections()
+    dataset = Dataset.objects.filter(pk=dataset_id).only('id', 'csv_file', 'summary').first()
+    if dataset is None:
+        return None
+    Dataset.objects.filter(pk=dataset_id).update(records_status=Dataset.RECORDS_LOADING)
+    if source_id is not None:
+        copy_records(source_id, dataset_id)
+    load_records(dataset)
+    done = loaded_rows(dataset_id) >= dataset.summary.get('total_count', 0)
+    status = Dataset.RECORDS_DONE if done else Dataset.RECORDS_FAILED
+    Dataset.objects.filter(pk=dataset_id).update(records_status=status)
+    return dataset_id
+
+
+def _on_records_done(dataset_id, future):
+    exc = future.exception()
+    if exc is not None:
+        logger.error('Loading records for dataset %s failed: %r', dataset_id, exc)
+        Dataset.objects.filter(pk=dataset_id).update(records_status=Dataset.RECORDS_FAILED)
+    with _records_lock:
+        _records_futures.pop(dataset_id, None)
+        if dataset_id in _records_again:
+            _submit_records(dataset_id, _records_again.pop(dataset_id))
+
+
+def _submit_records(dataset_id, source_id):
+    future = get_executor().submit(run_load_records, dataset_id, source_id)
+    _records_futures[dataset_id] = future
+    future.add_done_callback(lambda f: _on_records_done(dataset_id, f))
+    return future
+
+
+def schedule_records(dataset_id, source_id=None):
+    """Load the dataset's EquipmentRecords on the worker pool after the
+    response, so uploads do not wait for the inserts. A dataset already
+    loading is loaded again once that run ends, picking up appended rows."""
+    if not settings.EQUIPMENT_RECORDS:
+        return None
+    Dataset.objects.filter(pk=dataset_id).update(records_status=Dataset.RECORDS_PENDING)
+    with _records_lock:
+        future = _records_futures.get(dataset_id)
+        if future is not None and not future.done():
+            _records_again[dataset_id] = source_id
+            return future
+        return _submit_records(dataset_id, source_id)
+
+
+def run_dataset_stats(dataset_id, group_by, metrics):
+    close_old_connections()
+    dataset = Dataset.objects.get(pk=dataset_id)
+    return group_stats(dataset_store(dataset), group_by, metrics)
+
+
+def run_retention():
+    close_old_connections()
+    prune_uploads()
+    prune_scratch()
+    return prune()
+
+
+def start_retention_timer():
+    """Run retention every RETENTION_INTERVAL seconds from now on. Called
+    by the WSGI/ASGI entry points, so servers prune without waiting for an
+    upload; management commands and pool workers never start it."""
+    global _retention_timer
+    if not settings.RETENTION_INTERVAL or _retention_timer is not None:
+        return
+
+    def tick():
+        global _retention_timer
+        _retention_timer = None
+        schedule_retention()
+
+    _retention_timer = threading.Timer(settings.RETENTION_INTERVAL, tick)
+    _retention_timer.daemon = True
+    _retention_timer.start()
+
+
+def schedule_retention():
+    """Queue a retention pass on the worker pool unless one is already
+    waiting, and keep a periodic pass scheduled every RETENTION_INTERVAL."""
+    global _retention_future
+    with _retention_lock:
+        if _retention_future is None or _retention_future.done():
+            _retention_future = get_executor().submit(run_retention)
+        start_retention_timer()
+        return _retention_future
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import run_benchmarks, write_results
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time upload, list, detail, report and record aggregation endpoints on synthetic CSVs through the Django '
+        'test client and write the results as JSON. Uses a throwaway database and media directory.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, nargs='+', default=DEFAULT_SIZES,
+            help='Dataset sizes to run, e.g. --rows 1000 1000000 10000000 (default 1k, 10k, 100k).',
+        )
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per endpoint (default 3).')
+        parser.add_argument('--numeric-columns', type=int, default=3, help='Numeric columns per CSV (default 3).')
+        parser.add_argument('--types', type=int, default=8, help='Distinct equipment types (default 8).')
+        parser.add_argument('--data-dir', help='Where generated CSVs are kept between runs (default: temp dir).')
+        parser.add_argument('--output', default='benchmark.json', help='Results file (default benchmark.json).')
+
+    def handle(self, *args, **options):
+        results = run_benchmarks(
+            options['rows'],
+            repeat=options['repeat'],
+            numeric_columns=options['numeric_columns'],
+            types=options['types'],
+            data_dir=options['data_dir'],
+            log=self.stdout.write,
+        )
+        write_results(results, options['output'])
+        for entry in results['results']:
+            medians = ', '.join(f'{name} {t["median"] * 1000:.1f}ms' for name, t in entry['timings'].items())
+            throughput = ', '.join(f'{name} {rate:,.0f} rows/s' for name, rate in entry['rows_per_second'].items() if rate)
+            self.stdout.write(f'{entry["rows"]} rows: {medians}; {throughput}')
+        self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}.'))
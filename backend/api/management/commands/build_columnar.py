@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from api.columnar import build_store, open_store
+from api.models import Dataset
+
+
+class Command(BaseCommand):
+    help = 'Build the memory-mappable columnar copy for datasets that do not have one yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='Dataset ids to convert (default: all).')
+        parser.add_argument('--force', action='store_true', help='Rebuild stores that already exist.')
+
+    def handle(self, *args, **options):
+        datasets = Dataset.objects.exclude(csv_file='').order_by('id')
+        if options['ids']:
+            datasets = datasets.filter(id__in=options['ids'])
+
+        built = skipped = failed = 0
+        seen = set()
+        for dataset in datasets.iterator():
+            name = dataset.csv_file.name
+            # Deduplicated uploads share a file and therefore a store.
+            if name in seen or (not options['force'] and open_store(name) is not None):
+                skipped += 1
+                continue
+            seen.add(name)
+            try:
+                path = build_store(dataset.csv_file)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f'Dataset {dataset.id}: {e}')
+                continue
+            built += 1
+            self.stdout.write(f'Dataset {dataset.id} -> {path}')
+
+        self.stdout.write(self.style.SUCCESS(f'Built {built}, skipped {skipped}, failed {failed}.'))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Dataset
+from api.records import delete_records, load_records, loaded_rows
+
+
+class Command(BaseCommand):
+    help = 'Load EquipmentRecord rows for datasets ingested before records existed, or resume partial loads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='Dataset ids to load (default: all).')
+        parser.add_argument('--force', action='store_true', help='Delete and reload records that already exist.')
+
+    def handle(self, *args, **options):
+        datasets = Dataset.objects.exclude(csv_file='').only('id', 'csv_file', 'summary', 'records_status').order_by('id')
+        if options['ids']:
+            datasets = datasets.filter(id__in=options['ids'])
+
+        loaded = skipped = failed = 0
+        for dataset in datasets.iterator():
+            if options['force']:
+                delete_records(dataset.id)
+            total = dataset.summary.get('total_count', 0)
+            if loaded_rows(dataset) >= total:
+                if dataset.records_status != Dataset.RECORDS_DONE:
+                    Dataset.objects.filter(pk=dataset.pk).update(records_status=Dataset.RECORDS_DONE)
+                skipped += 1
+                continue
+            rows = load_records(dataset)
+            done = loaded_rows(dataset) >= total
+            Dataset.objects.filter(pk=dataset.pk).update(
+                records_status=Dataset.RECORDS_DONE if done else Dataset.RECORDS_FAILED,
+            )
+            if not done:
+                failed += 1
+                self.stderr.write(f'Dataset {dataset.id}: stopped after {rows} rows, see the log.')
+                continue
+            loaded += 1
+            self.stdout.write(f'Dataset {dataset.id}: {rows} rows')
+
+        self.stdout.write(self.style.SUCCESS(f'Loaded {loaded}, skipped {skipped}, failed {failed}.'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import generate_csv
+
+
+class Command(BaseCommand):
+    help = 'Write a synthetic CSV shaped like sample_equipment_data.csv.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Output CSV path.')
+        parser.add_argument('--rows', type=int, default=1000, help='Number of data rows (default 1000).')
+        parser.add_argument('--numeric-columns', type=int, default=3, help='Number of numeric columns (default 3).')
+        parser.add_argument('--types', type=int, default=8, help='Number of distinct equipment types (default 8).')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default 0).')
+
+    def handle(self, *args, **options):
+        path = generate_csv(
+            options['path'],
+            options['rows'],
+            numeric_columns=options['numeric_columns'],
+            types=options['types'],
+            seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Wrote {options["rows"]} rows to {path}.'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from api.retention import prune
+
+
+class Command(BaseCommand):
+    help = 'Delete datasets outside the retention policy, with their files and derived artifacts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-count', type=int, help='Override RETENTION_MAX_COUNT.')
+        parser.add_argument('--max-age-days', type=float, help='Override RETENTION_MAX_AGE_DAYS.')
+        parser.add_argument('--max-total-bytes', type=int, help='Override RETENTION_MAX_TOTAL_BYTES.')
+        parser.add_argument('--batch-size', type=int, help='Override RETENTION_BATCH_SIZE.')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many datasets would go.')
+
+    def handle(self, *args, **options):
+        deleted, freed = prune(
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            max_count=options['max_count'],
+            max_age_days=options['max_age_days'],
+            max_total_bytes=options['max_total_bytes'],
+        )
+        if options['dry_run']:
+            self.stdout.write(f'{deleted} datasets would be deleted.')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} datasets, freed {freed} bytes.'))
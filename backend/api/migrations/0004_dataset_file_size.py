@@ -0,0 +1,29 @@
+# Generated by Django 4.2.14 on 2026-10-18 06:27
+
+from django.db import migrations, models
+
+
+def fill_file_sizes(apps, schema_editor):
+    Dataset = apps.get_model('api', 'Dataset')
+    for dataset in Dataset.objects.exclude(csv_file='').iterator():
+        try:
+            size = dataset.csv_file.size
+        except OSError:
+            continue
+        Dataset.objects.filter(pk=dataset.pk).update(file_size=size)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='file_size',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_file_sizes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def copy_uploaded_at(apps, schema_editor):
+    Dataset = apps.get_model('api', 'Dataset')
+    Dataset.objects.update(updated_at=F('uploaded_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_dataset_file_size'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='stats_state',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.RunPython(copy_uploaded_at, migrations.RunPython.noop),
+    ]
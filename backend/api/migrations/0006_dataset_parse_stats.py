@@ -0,0 +1,18 @@
+# Generated by Django 4.2.14 on 2026-10-18 06:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_dataset_append'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='parse_stats',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.14 on 2026-10-18 07:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_chunkedupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row', models.IntegerField()),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('type', models.CharField(blank=True, max_length=100)),
+                ('flowrate', models.FloatField(blank=True, null=True)),
+                ('pressure', models.FloatField(blank=True, null=True)),
+                ('temperature', models.FloatField(blank=True, null=True)),
+                ('extra', models.JSONField(blank=True, default=dict)),
+                ('dataset', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='records', to='api.dataset')),
+            ],
+            options={
+                'ordering': ['dataset', 'row'],
+                'indexes': [models.Index(fields=['type', 'dataset'], name='api_equipme_type_2cfdad_idx'), models.Index(fields=['name'], name='api_equipme_name_2b4b8b_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='equipmentrecord',
+            constraint=models.UniqueConstraint(fields=('dataset', 'row'), name='record_dataset_row'),
+        ),
+    ]
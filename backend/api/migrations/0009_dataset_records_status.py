@@ -0,0 +1,18 @@
+# Generated by Django 4.2.14 on 2026-10-18 07:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_equipmentrecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='records_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('loading', 'Loading'), ('done', 'Done'), ('failed', 'Failed')], max_length=10),
+        ),
+    ]
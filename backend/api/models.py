@@ -2,13 +2,117 @@ from django.db import models
 
 
 class Dataset(models.Model):
+    # Background load of the dataset's EquipmentRecords (api.records); blank
+    # when none was scheduled (datasets from before records existed, or
+    # EQUIPMENT_RECORDS off).
+    RECORDS_PENDING = 'pending'
+    RECORDS_LOADING = 'loading'
+    RECORDS_DONE = 'done'
+    RECORDS_FAILED = 'failed'
+    RECORDS_STATUS_CHOICES = [
+        (RECORDS_PENDING, 'Pending'),
+        (RECORDS_LOADING, 'Loading'),
+        (RECORDS_DONE, 'Done'),
+        (RECORDS_FAILED, 'Failed'),
+    ]
+
     name = models.CharField(max_length=255)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     csv_file = models.FileField(upload_to='uploads/')
     summary = models.JSONField(default=dict)
+    stats_state = models.JSONField(default=dict)
+    parse_stats = models.JSONField(default=dict, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    file_size = models.BigIntegerField(default=0)
+    records_status = models.CharField(max_length=10, choices=RECORDS_STATUS_CHOICES, blank=True)
 
     class Meta:
         ordering = ['-uploaded_at']
 
     def __str__(self):
         return f"{self.name} ({self.uploaded_at:%Y-%m-%d %H:%M})"
+
+
+class IngestJob(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=255)
+    csv_file = models.FileField(upload_to='uploads/')
+    content_hash = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    progress = models.FloatField(default=0.0)
+    dataset = models.ForeignKey(Dataset, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Job {self.id}: {self.name} [{self.status}]"
+
+
+class ChunkedUpload(models.Model):
+    """A CSV sent in fixed-size chunks that may arrive out of order. The
+    chunks themselves live on disk (see ``api.chunked``) until the upload
+    is completed."""
+
+    name = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    chunk_size = models.IntegerField()
+    sha256 = models.CharField(max_length=64, blank=True)
+    dataset = models.ForeignKey(Dataset, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    job = models.ForeignKey(IngestJob, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Upload {self.id}: {self.name} ({self.size} bytes)"
+
+    @property
+    def chunk_count(self):
+        return -(-self.size // self.chunk_size)
+
+
+class EquipmentRecord(models.Model):
+    """One CSV row, loaded at ingest so rows can be filtered and aggregated
+    across datasets in SQL. The usual parameters get their own columns;
+    anything else in the row goes to ``extra``."""
+
+    # Covered by the (dataset, row) constraint's index.
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='records', db_index=False)
+    row = models.IntegerField()
+    name = models.CharField(max_length=255, blank=True)
+    type = models.CharField(max_length=100, blank=True)
+    flowrate = models.FloatField(null=True, blank=True)
+    pressure = models.FloatField(null=True, blank=True)
+    temperature = models.FloatField(null=True, blank=True)
+    extra = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        ordering = ['dataset', 'row']
+        constraints = [
+            models.UniqueConstraint(fields=['dataset', 'row'], name='record_dataset_row'),
+        ]
+        indexes = [
+            models.Index(fields=['type', 'dataset']),
+            models.Index(fields=['name']),
+        ]
+
+    def __str__(self):
+        return f"{self.name or 'Row ' + str(self.row)} ({self.type})"
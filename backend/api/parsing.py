@@ -0,0 +1,120 @@
+import sys
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:
+    pyarrow = None
+
+SCHEMA_SAMPLE_ROWS = 10_000
+# Text columns whose sample has at most this share of distinct values are
+# parsed as categoricals.
+CATEGORY_MAX_RATIO = 0.5
+
+
+def frame_bytes(frame):
+    return int(frame.memory_usage(index=False, deep=True).sum())
+
+
+def default_bytes(frame):
+    """Memory the frame would take with pandas' default inference, where
+    categoricals would be object columns of Python strings."""
+    total = 0
+    for col in frame.columns:
+        series = frame[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            sizes = np.array([sys.getsizeof(v) for v in series.cat.categories], dtype=np.int64)
+            codes = series.cat.codes.to_numpy()
+            total += 8 * len(codes) + int(sizes[codes[codes >= 0]].sum()) + 24 * int((codes < 0).sum())
+        elif series.dtype.kind in 'iu':
+            total += 8 * len(series)
+        else:
+            total += int(series.memory_usage(index=False, deep=True))
+    return total
+
+
+def downcast(frame):
+    """Shrink integer columns to the narrowest type that holds them. Floats
+    stay float64: the summary and the columnar store accumulate in float64
+    and float32 would not round-trip decimal CSV values."""
+    for col in frame.columns:
+        if frame[col].dtype.kind in 'iu':
+            frame[col] = pd.to_numeric(frame[col], downcast='integer')
+    return frame
+
+
+class CSVParser:
+    """Reads a CSV in chunks with a schema detected from a leading sample:
+    low-cardinality text columns become categoricals and integer columns are
+    downcast.
+
+    Memory is tracked as ``peak_bytes`` (largest frame held at once),
+    ``final_bytes`` (all rows as optimised frames) and ``default_bytes``
+    (all rows with pandas' default inference).
+    """
+
+    def __init__(self, chunk_rows=None, sample_rows=SCHEMA_SAMPLE_ROWS):
+        self.chunk_rows = settings.CSV_CHUNK_ROWS if chunk_rows is None else chunk_rows
+        self.sample_rows = sample_rows
+        self.dtypes = {}
+        self.engine = 'c'
+        self.peak_bytes = 0
+        self.final_bytes = 0
+        self.default_bytes = 0
+        self.rows = 0
+
+    def detect_schema(self, fileobj):
+        try:
+            start = fileobj.tell()
+            sample = pd.read_csv(fileobj, nrows=self.sample_rows)
+            fileobj.seek(start)
+        except (AttributeError, OSError, ValueError):
+            return {}
+        dtypes = {}
+        for col in sample.columns:
+            series = sample[col]
+            if series.dtype != object:
+                continue
+            present = series.dropna()
+            if len(present) and present.nunique() <= max(1, len(present) * CATEGORY_MAX_RATIO):
+                dtypes[col] = 'category'
+        return dtypes
+
+    def _account(self, parsed_bytes, frame):
+        self.rows += len(frame)
+        self.default_bytes += default_bytes(frame)
+        self.final_bytes += frame_bytes(frame)
+        # The largest frame held at once, before integer downcasting.
+        self.peak_bytes = max(self.peak_bytes, parsed_bytes)
+
+    def chunks(self, fileobj):
+        self.dtypes = self.detect_schema(fileobj)
+        if not self.chunk_rows:
+            # pyarrow reads the whole file in parallel but cannot stream chunks.
+            self.engine = 'pyarrow' if pyarrow is not None else 'c'
+            frame = pd.read_csv(fileobj, dtype=self.dtypes or None, engine=self.engine)
+            parsed_bytes = frame_bytes(frame)
+            self._account(parsed_bytes, downcast(frame))
+            yield frame
+            return
+        for chunk in pd.read_csv(fileobj, chunksize=self.chunk_rows, dtype=self.dtypes or None):
+            parsed_bytes = frame_bytes(chunk)
+            self._account(parsed_bytes, downcast(chunk))
+            yield chunk
+
+    def stats(self, previous=None):
+        """Parse metadata for the dataset; ``previous`` holds the figures of
+        rows parsed earlier (before an append) and is folded in."""
+        previous = previous or {}
+        categorical = [col.strip() for col, dtype in self.dtypes.items() if dtype == 'category']
+        return {
+            'engine': previous.get('engine', self.engine),
+            'rows': previous.get('rows', 0) + self.rows,
+            'categorical_columns': previous.get('categorical_columns', categorical),
+            'peak_bytes': max(previous.get('peak_bytes', 0), self.peak_bytes),
+            'final_bytes': previous.get('final_bytes', 0) + self.final_bytes,
+            'default_bytes': previous.get('default_bytes', 0) + self.default_bytes,
+        }
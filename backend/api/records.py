@@ -0,0 +1,223 @@
+import json
+import logging
+import math
+import time
+from itertools import repeat
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, Count, F, FloatField, Max, Min, Sum
+
+from .columnar import dataset_store
+from .ingest import find_name_column, find_type_column
+from .models import EquipmentRecord
+
+logger = logging.getLogger(__name__)
+
+# EquipmentRecord field -> CSV headers it is loaded from.
+PARAMETER_COLUMNS = {
+    'flowrate': ['Flowrate', 'flowrate', 'Flow Rate', 'flow_rate'],
+    'pressure': ['Pressure', 'pressure'],
+    'temperature': ['Temperature', 'temperature'],
+}
+PARAMETERS = list(PARAMETER_COLUMNS)
+GROUP_FIELDS = {'type': 'type', 'dataset': 'dataset_id', 'name': 'name'}
+AGGREGATES = {
+    'count': Count,
+    'mean': Avg,
+    'min': Min,
+    'max': Max,
+    'sum': Sum,
+    # Finished in Python from the moments below: SQLite has no STDDEV and
+    # Django's fallback runs a Python aggregate per row.
+    'std': None,
+}
+STD_MOMENTS = {
+    'n': Count,
+    'sum': Sum,
+    'sumsq': lambda field: Sum(F(field) * F(field), output_field=FloatField()),
+}
+DEFAULT_AGGREGATES = ['count', 'mean', 'min', 'max']
+COPY_FIELDS = ['row', 'name', 'type', *PARAMETERS, 'extra']
+
+
+class RecordsError(ValueError):
+    pass
+
+
+def column_mapping(store):
+    """Which store columns feed the name, type and parameter fields; the
+    rest go to ``extra``."""
+    name_col = find_name_column(store.columns)
+    type_col = find_type_column(store.columns)
+    params = {}
+    for field, candidates in PARAMETER_COLUMNS.items():
+        params[field] = next((c for c in candidates if c in store.specs and store.is_numeric(c)), None)
+    used = {name_col, type_col, *params.values()}
+    extra = [c for c in store.columns if c not in used]
+    return name_col, type_col, params, extra
+
+
+def _insert_sql():
+    qn = connection.ops.quote_name
+    fields = ['dataset_id', *COPY_FIELDS]
+    return (
+        f'INSERT INTO {qn(EquipmentRecord._meta.db_table)} ({", ".join(qn(f) for f in fields)}) '
+        f'VALUES ({", ".join(["%s"] * len(fields))})'
+    )
+
+
+def _text(values):
+    return ['' if v is None else str(v) for v in values]
+
+
+def _yield_lock():
+    # SQLite has no queue for its write lock: a waiting writer polls with
+    # growing sleeps and keeps missing the gap between back-to-back batches.
+    if settings.RECORD_BATCH_PAUSE:
+        time.sleep(settings.RECORD_BATCH_PAUSE)
+
+
+def loaded_rows(dataset):
+    """Rows loaded so far; ``dataset`` is a Dataset or its id."""
+    last = EquipmentRecord.objects.filter(dataset=dataset).aggregate(last=Max('row'))['last']
+    return 0 if last is None else last + 1
+
+
+def load_records(dataset, store=None, batch_rows=None):
+    """Insert the dataset's rows not yet in EquipmentRecord, read from its
+    columnar store in batches of RECORD_BATCH_ROWS. Rows go in through
+    ``executemany`` on a prepared INSERT, one transaction per batch:
+    building a model instance per row for ``bulk_create`` cost more than
+    the insert itself.
+
+    Batches are RECORD_BATCH_PAUSE seconds apart so uploads get the SQLite
+    write lock. Records are derived data, like the columnar store: a failure
+    is logged and rolls back to the last whole batch, and the next call (or
+    ``manage.py build_records``) picks up from there. Returns the number of
+    rows inserted.
+    """
+    if not settings.EQUIPMENT_RECORDS:
+        return 0
+    batch_rows = batch_rows or settings.RECORD_BATCH_ROWS
+    start = loaded_rows(dataset)
+    inserted = 0
+    try:
+        store = store or dataset_store(dataset)
+        name_col, type_col, params, extra_cols = column_mapping(store)
+        sql = _insert_sql()
+        for lo in range(start, len(store), batch_rows):
+            hi = min(lo + batch_rows, len(store))
+            n = hi - lo
+            names = _text(store.values(name_col, lo, hi)) if name_col else repeat('', n)
+            types = _text(store.values(type_col, lo, hi)) if type_col else repeat('', n)
+            values = [store.values(col, lo, hi) if col else repeat(None, n) for col in params.values()]
+            if extra_cols:
+                columns = [store.values(col, lo, hi) for col in extra_cols]
+                extras = [json.dumps(dict(zip(extra_cols, row))) for row in zip(*columns)]
+            else:
+                extras = repeat('{}', n)
+            rows = zip(repeat(dataset.id, n), range(lo, hi), names, types, *values, extras)
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, rows)
+            inserted += n
+            _yield_lock()
+    except Exception:
+        logger.exception('Loading records for dataset %s stopped after %s rows', dataset.id, inserted)
+    return inserted
+
+
+def copy_records(source_id, target_id, batch_rows=None):
+    """Give a deduplicated upload the records of the dataset it shares a
+    file with, copied inside the database RECORD_BATCH_ROWS rows per
+    transaction. Only rows the source already has are copied; the caller
+    loads the rest. Returns the number of rows copied."""
+    if not settings.EQUIPMENT_RECORDS:
+        return 0
+    batch_rows = batch_rows or settings.RECORD_BATCH_ROWS
+    qn = connection.ops.quote_name
+    table = qn(EquipmentRecord._meta.db_table)
+    fields = ', '.join(qn(f) for f in COPY_FIELDS)
+    sql = (
+        f'INSERT INTO {table} ({qn("dataset_id")}, {fields}) '
+        f'SELECT %s, {fields} FROM {table} WHERE {qn("dataset_id")} = %s AND {qn("row")} >= %s AND {qn("row")} < %s'
+    )
+    copied = 0
+    for lo in range(loaded_rows(target_id), loaded_rows(source_id), batch_rows):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, [target_id, source_id, lo, lo + batch_rows])
+            copied += cursor.rowcount
+        _yield_lock()
+    return copied
+
+
+def delete_records(dataset_id, batch_rows=None):
+    """Delete a dataset's records RECORD_BATCH_ROWS rows per transaction,
+    last rows first, so other writers get the SQLite lock between batches
+    and an interrupted delete leaves a loaded prefix behind."""
+    batch_rows = batch_rows or settings.RECORD_BATCH_ROWS
+    deleted = 0
+    for hi in range(loaded_rows(dataset_id), 0, -batch_rows):
+        with transaction.atomic():
+            deleted += EquipmentRecord.objects.filter(dataset_id=dataset_id, row__gte=hi - batch_rows).delete()[0]
+        _yield_lock()
+    return deleted
+
+
+def _std(row, param):
+    n, total, sumsq = (row[f'{param}__std_{moment}'] for moment in STD_MOMENTS)
+    if n < 2:
+        return None
+    return math.sqrt(max(sumsq - total * total / n, 0.0) / (n - 1))
+
+
+def _split(raw):
+    return [part.strip() for part in (raw or '').split(',') if part.strip()]
+
+
+def aggregate_records(group_by=None, aggregates=None, parameters=None, datasets=None, types=None):
+    """Aggregate EquipmentRecords with one GROUP BY query. Every argument is
+    the raw comma-separated query parameter; raises RecordsError for
+    unknown names."""
+    group_by = _split(group_by) or ['type']
+    aggregates = [a.lower() for a in _split(aggregates)] or list(DEFAULT_AGGREGATES)
+    parameters = [p.lower() for p in _split(parameters)] or list(PARAMETERS)
+    for names, allowed, label in (
+        (group_by, GROUP_FIELDS, 'group_by'),
+        (aggregates, AGGREGATES, 'metric'),
+        (parameters, PARAMETER_COLUMNS, 'parameter'),
+    ):
+        unknown = [n for n in names if n not in allowed]
+        if unknown:
+            raise RecordsError(f'Unknown {label}: {", ".join(unknown)}. Use {", ".join(allowed)}.')
+
+    records = EquipmentRecord.objects.all()
+    if datasets:
+        try:
+            records = records.filter(dataset_id__in=[int(i) for i in _split(datasets)])
+        except ValueError:
+            raise RecordsError('datasets must be a comma-separated list of ids.')
+    if types:
+        records = records.filter(type__in=_split(types))
+
+    fields = [GROUP_FIELDS[g] for g in group_by]
+    annotations = {'rows': Count('id')}
+    for param in parameters:
+        for agg in aggregates:
+            if agg == 'std':
+                for moment, func in STD_MOMENTS.items():
+                    annotations[f'{param}__std_{moment}'] = func(param)
+            else:
+                annotations[f'{param}__{agg}'] = AGGREGATES[agg](param)
+    rows = records.order_by().values(*fields).annotate(**annotations).order_by(*fields)
+
+    results = []
+    for row in rows:
+        entry = {g: row[GROUP_FIELDS[g]] for g in group_by}
+        entry['rows'] = row['rows']
+        for param in parameters:
+            entry[param] = {
+                agg: _std(row, param) if agg == 'std' else row[f'{param}__{agg}'] for agg in aggregates
+            }
+        results.append(entry)
+    return {'group_by': group_by, 'metrics': aggregates, 'parameters': parameters, 'results': results}
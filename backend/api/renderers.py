@@ -0,0 +1,45 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer backed by orjson when it is installed. Pretty-printed
+    output (``; indent=N`` or the browsable API) still goes through the
+    stdlib encoder. NaN is written as null, which keeps the output valid
+    JSON."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Compact binary alternative to JSON, selected with
+    ``Accept: application/msgpack``. Only enabled when msgpack is installed."""
+
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        encoder = JSONRenderer.encoder_class()
+        return msgpack.packb(data, default=encoder.default, use_bin_type=True)
@@ -0,0 +1,86 @@
+import os
+import uuid
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+REPORTS_DIR = 'reports'
+
+
+def report_path(dataset_id):
+    return Path(settings.MEDIA_ROOT) / REPORTS_DIR / f'chemflux_report_{dataset_id}.pdf'
+
+
+def render_report(dataset):
+    buf = BytesIO()
+    p = canvas.Canvas(buf, pagesize=A4)
+    width, height = A4
+
+    y = height - 50
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(50, y, "ChemFlux Report")
+    y -= 25
+
+    p.setFont("Helvetica", 10)
+    p.drawString(50, y, f"Dataset: {dataset.name}")
+    y -= 15
+    p.drawString(50, y, f"Uploaded At: {dataset.uploaded_at.strftime('%Y-%m-%d %H:%M:%S')}")
+    y -= 25
+
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(50, y, "Summary")
+    y -= 18
+    p.setFont("Helvetica", 10)
+    summary = dataset.summary or {}
+    p.drawString(50, y, f"Total Count: {summary.get('total_count', 0)}")
+    y -= 15
+
+    averages = summary.get('averages', {})
+    p.drawString(50, y, "Averages:")
+    y -= 15
+    for k, v in averages.items():
+        p.drawString(70, y, f"- {k}: {v}")
+        y -= 14
+        if y < 80:
+            p.showPage()
+            y = height - 50
+            p.setFont("Helvetica", 10)
+
+    type_dist = summary.get('type_distribution', {})
+    p.drawString(50, y, "Type Distribution:")
+    y -= 15
+    for k, v in type_dist.items():
+        p.drawString(70, y, f"- {k}: {v}")
+        y -= 14
+        if y < 80:
+            p.showPage()
+            y = height - 50
+            p.setFont("Helvetica", 10)
+
+    p.showPage()
+    p.save()
+    pdf = buf.getvalue()
+    buf.close()
+    return pdf
+
+
+def get_report(dataset):
+    """Path to the dataset's PDF report, rendering it on first use.
+
+    The file is reused until the dataset is deleted or rows are appended to
+    it, both of which call ``discard_report``.
+    """
+    path = report_path(dataset.id)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'.{path.name}.{uuid.uuid4().hex}')
+        tmp.write_bytes(render_report(dataset))
+        os.replace(tmp, path)
+    return path
+
+
+def discard_report(dataset_id):
+    report_path(dataset_id).unlink(missing_ok=True)
@@ -0,0 +1,129 @@
+import logging
+import shutil
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .columnar import SCRATCH_PREFIX, columnar_root, store_path
+from .models import Dataset, IngestJob
+from .records import delete_records
+
+logger = logging.getLogger(__name__)
+
+
+def expired_dataset_ids(max_count=None, max_age_days=None, max_total_bytes=None):
+    """Ids of datasets outside the retention policy, oldest first.
+
+    Walks datasets newest first and keeps them while every configured limit
+    (count, age, total stored bytes) still holds. Deduplicated uploads share
+    a file, so each file's bytes are counted once.
+    """
+    if max_count is None:
+        max_count = settings.RETENTION_MAX_COUNT
+    if max_age_days is None:
+        max_age_days = settings.RETENTION_MAX_AGE_DAYS
+    if max_total_bytes is None:
+        max_total_bytes = settings.RETENTION_MAX_TOTAL_BYTES
+    cutoff = timezone.now() - timedelta(days=max_age_days) if max_age_days else None
+
+    kept = 0
+    total_bytes = 0
+    seen_files = set()
+    expired = []
+    rows = Dataset.objects.order_by('-uploaded_at').values_list('id', 'uploaded_at', 'csv_file', 'file_size')
+    for pk, uploaded_at, csv_name, file_size in rows.iterator():
+        if csv_name not in seen_files:
+            seen_files.add(csv_name)
+            total_bytes += file_size
+        keep = (
+            (not max_count or kept < max_count)
+            and (cutoff is None or uploaded_at >= cutoff)
+            and (not max_total_bytes or total_bytes <= max_total_bytes)
+        )
+        if keep:
+            kept += 1
+        else:
+            expired.append(pk)
+    expired.reverse()
+    return expired
+
+
+def _file_in_use(csv_name):
+    active_jobs = IngestJob.objects.filter(status__in=[IngestJob.PENDING, IngestJob.RUNNING])
+    return (
+        Dataset.objects.filter(csv_file=csv_name).exists()
+        or active_jobs.filter(csv_file=csv_name).exists()
+    )
+
+
+def _reclaim_files(csv_names):
+    storage = Dataset._meta.get_field('csv_file').storage
+    freed = 0
+    for csv_name in csv_names:
+        if not csv_name or _file_in_use(csv_name):
+            continue
+        try:
+            if storage.exists(csv_name):
+                freed += storage.size(csv_name)
+                storage.delete(csv_name)
+        except OSError:
+            logger.warning('Could not delete %s', csv_name, exc_info=True)
+        shutil.rmtree(store_path(csv_name), ignore_errors=True)
+    return freed
+
+
+def prune(batch_size=None, dry_run=False, **policy):
+    """Apply the retention policy in batches and return (deleted, bytes_freed).
+
+    Each batch is its own short transaction, so uploads writing to SQLite
+    only ever wait for one batch; a dataset's EquipmentRecords are deleted
+    before it, RECORD_BATCH_ROWS per transaction, so the cascade inside
+    the batch has nothing left to do. Files and columnar stores are removed
+    after the rows are gone, and only once no dataset refers to them.
+    Cached reports go with their dataset through the post_delete signal.
+    """
+    if batch_size is None:
+        batch_size = settings.RETENTION_BATCH_SIZE
+    expired = expired_dataset_ids(**policy)
+    if dry_run:
+        return len(expired), 0
+
+    deleted = freed = 0
+    for start in range(0, len(expired), batch_size):
+        batch = expired[start:start + batch_size]
+        for pk in batch:
+            delete_records(pk)
+        with transaction.atomic():
+            csv_names = set(Dataset.objects.filter(id__in=batch).values_list('csv_file', flat=True))
+            _, counts = Dataset.objects.filter(id__in=batch).delete()
+        deleted += counts.get(Dataset._meta.label, 0)
+        freed += _reclaim_files(csv_names)
+    if deleted:
+        logger.info('Retention removed %s datasets, freed %s bytes', deleted, freed)
+    return deleted, freed
+
+
+def prune_scratch(max_age_hours=None):
+    """Remove columnar scratch directories left by ingests that died before
+    committing or aborting. A directory counts as abandoned once nothing in
+    it was written for COLUMNAR_SCRATCH_MAX_AGE_HOURS."""
+    if max_age_hours is None:
+        max_age_hours = settings.COLUMNAR_SCRATCH_MAX_AGE_HOURS
+    if not max_age_hours or not columnar_root().exists():
+        return 0
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+    for path in columnar_root().glob(f'{SCRATCH_PREFIX}*'):
+        try:
+            last_write = max(p.stat().st_mtime for p in [path, *path.iterdir()])
+        except OSError:
+            continue
+        if last_write < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    if removed:
+        logger.info('Removed %s abandoned columnar scratch directories', removed)
+    return removed
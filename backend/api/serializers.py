@@ -1,8 +1,42 @@
 from rest_framework import serializers
-from .models import Dataset
+from .chunked import received_bytes, received_chunks
+from .models import ChunkedUpload, Dataset, IngestJob
 
 
 class DatasetSerializer(serializers.ModelSerializer):
+    LIST_FIELDS = ['id', 'name', 'uploaded_at']
+
     class Meta:
         model = Dataset
-        fields = ['id', 'name', 'uploaded_at', 'summary']
+        fields = ['id', 'name', 'uploaded_at', 'updated_at', 'summary', 'parse_stats']
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class IngestJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = IngestJob
+        fields = ['id', 'name', 'status', 'progress', 'dataset', 'error', 'created_at', 'updated_at']
+
+
+class ChunkedUploadSerializer(serializers.ModelSerializer):
+    chunk_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = ChunkedUpload
+        fields = [
+            'id', 'name', 'size', 'chunk_size', 'chunk_count', 'sha256',
+            'dataset', 'job', 'created_at', 'updated_at', 'completed_at',
+        ]
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Chunks received so far, by index, read from the upload directory.
+        chunks = received_chunks(instance)
+        data['received'] = chunks
+        data['received_bytes'] = received_bytes(instance, chunks)
+        return data
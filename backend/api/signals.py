@@ -0,0 +1,25 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import forget_token
+from .models import Dataset
+from .reports import discard_report
+
+
+@receiver(post_delete, sender=Dataset)
+def remove_dataset_report(sender, instance, **kwargs):
+    discard_report(instance.id)
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    forget_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def evict_user_tokens(sender, instance, **kwargs):
+    # Deactivation and other changes must not be served from a cached user.
+    for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+        forget_token(key)
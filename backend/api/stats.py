@@ -0,0 +1,114 @@
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+from .ingest import find_type_column
+
+BASIC_METRICS = ['count', 'mean', 'min', 'max', 'std']
+DEFAULT_METRICS = BASIC_METRICS + ['p25', 'p50', 'p75']
+PERCENTILE_RE = re.compile(r'^p(\d{1,2}(?:\.\d+)?|100)$')
+MISSING_GROUP = 'nan'
+
+
+class StatsError(ValueError):
+    pass
+
+
+def parse_metrics(raw):
+    if not raw:
+        return list(DEFAULT_METRICS)
+    metrics = []
+    seen = set()
+    for name in (m.strip().lower() for m in raw.split(',')):
+        if not name:
+            continue
+        if name not in BASIC_METRICS and not PERCENTILE_RE.match(name):
+            raise StatsError(f'Unknown metric "{name}". Use {", ".join(BASIC_METRICS)} or pNN.')
+        # p5 and p05, or p50 and p50.0, are the same quantile; keep the first spelling.
+        key = name if name in BASIC_METRICS else float(name[1:])
+        if key in seen:
+            continue
+        seen.add(key)
+        metrics.append(name)
+    return metrics
+
+
+def resolve_group_by(store, group_by):
+    if not group_by:
+        group_by = find_type_column(store.columns)
+        if group_by is None:
+            raise StatsError('Dataset has no Type column; pass group_by explicitly.')
+    if group_by not in store.specs:
+        raise StatsError(f'Unknown column "{group_by}".')
+    if store.is_numeric(group_by):
+        raise StatsError(f'Cannot group by numeric column "{group_by}".')
+    if store.is_text(group_by):
+        raise StatsError(f'Column "{group_by}" has too many distinct values to group by.')
+    return group_by
+
+
+def _clean(value):
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+def _describe(agg, quantiles, columns, basic, percentiles, key=None):
+    out = {}
+    for col in columns:
+        entry = {}
+        for metric in basic:
+            value = agg[(col, metric)] if key is None else agg.at[key, (col, metric)]
+            entry[metric] = int(value) if metric == 'count' else _clean(value)
+        for name, q in percentiles:
+            value = quantiles.at[q, col] if key is None else quantiles.at[(key, q), col]
+            entry[name] = _clean(value)
+        out[col] = entry
+    return out
+
+
+def compute_group_stats(store, group_by, metrics):
+    """Statistics per group of ``group_by`` plus overall; with ``group_by``
+    None only the overall figures are computed."""
+    columns = [c for c in store.columns if store.is_numeric(c)]
+    codes = np.asarray(store.raw(group_by)) if group_by else np.zeros(len(store), dtype=np.int32)
+    frame = pd.DataFrame({c: store.raw(c) for c in columns}, index=pd.RangeIndex(len(store)))
+
+    basic = [m for m in metrics if m in BASIC_METRICS]
+    percentiles = [(m, float(m[1:]) / 100) for m in metrics if m not in BASIC_METRICS]
+    qs = [q for _, q in percentiles]
+
+    overall_agg = frame.agg(basic).unstack() if columns and basic else None
+    overall_q = frame.quantile(qs) if columns and qs else None
+
+    groups = {}
+    if group_by:
+        grouped = frame.groupby(codes, sort=True)
+        group_agg = grouped.agg(basic) if columns and basic else None
+        group_q = grouped.quantile(qs) if columns and qs else None
+        categories = store.categories(group_by)
+        sizes = pd.Series(codes).value_counts().sort_index()
+    else:
+        sizes = pd.Series(dtype='int64')
+    for code, size in sizes.items():
+        label = MISSING_GROUP if code < 0 else str(categories[code])
+        groups[label] = {
+            'rows': int(size),
+            'columns': _describe(group_agg, group_q, columns, basic, percentiles, key=code),
+        }
+
+    return {
+        'group_by': group_by,
+        'metrics': metrics,
+        'columns': columns,
+        'groups': groups,
+        'overall': {
+            'rows': len(store),
+            'columns': _describe(overall_agg, overall_q, columns, basic, percentiles),
+        },
+    }
+
+
+def group_stats(store, group_by, metrics):
+    return store.cached('stats', [group_by, metrics], lambda: compute_group_stats(store, group_by, metrics))
@@ -0,0 +1,46 @@
+import io
+import shutil
+import tempfile
+
+import pandas as pd
+from django.test import SimpleTestCase, override_settings
+
+from .columnar import ColumnarStore, ColumnarWriter
+from .ingest import summarize_csv
+from .parsing import CSVParser
+
+# "Code" is numeric in the first chunk of two rows and text in the second.
+MIXED_CSV = (
+    b'Equipment Name,Type,Flowrate,Code\n'
+    b'P-1,Pump,1.5,10\n'
+    b'V-1,Valve,2.5,20\n'
+    b'P-2,Pump,3.5,X7\n'
+)
+
+
+class LateTextColumnTests(SimpleTestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def summarize(self, consumers=()):
+        parser = CSVParser(chunk_rows=2, sample_rows=2)
+        return summarize_csv(io.BytesIO(MIXED_CSV), consumers=consumers, parser=parser)
+
+    def test_summary_matches_whole_file_parse(self):
+        summary = self.summarize()
+        whole = pd.read_csv(io.BytesIO(MIXED_CSV))
+        self.assertEqual(list(summary['averages']), ['Flowrate'])
+        self.assertEqual(list(summary['quantiles']), ['Flowrate'])
+        self.assertEqual([row['Code'] for row in summary['preview']], whole['Code'].tolist())
+
+    def test_store_keeps_earlier_values_as_text(self):
+        writer = ColumnarWriter()
+        self.summarize(consumers=[writer])
+        store = ColumnarStore(writer.commit('uploads/mixed.csv'))
+        self.assertFalse(store.is_numeric('Code'))
+        self.assertEqual(store.values('Code'), ['10', '20', 'X7'])
+        self.assertEqual(store.values('Flowrate'), [1.5, 2.5, 3.5])
@@ -0,0 +1,169 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+_phases = contextvars.ContextVar('server_timing_phases', default=None)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+RATE_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [f'{self.name}{_labels(key)} {value}' for key, value in sorted(self.values.items())]
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            entry = self.values.setdefault(key, {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['buckets'][i] += 1
+            entry['sum'] += value
+            entry['count'] += 1
+
+    def samples(self):
+        lines = []
+        with self.lock:
+            for key, entry in sorted(self.values.items()):
+                for bound, n in zip(self.buckets, entry['buckets']):
+                    lines.append(f'{self.name}_bucket{_labels(key + (("le", f"{bound:g}"),))} {n}')
+                lines.append(f'{self.name}_bucket{_labels(key + (("le", "+Inf"),))} {entry["count"]}')
+                lines.append(f'{self.name}_sum{_labels(key)} {entry["sum"]}')
+                lines.append(f'{self.name}_count{_labels(key)} {entry["count"]}')
+        return lines
+
+
+REQUESTS = Counter('chemflux_requests_total', 'HTTP requests by view, method and status.')
+REQUEST_SECONDS = Histogram('chemflux_request_duration_seconds', 'Request latency by view.')
+PHASE_SECONDS = Histogram('chemflux_phase_duration_seconds', 'Time spent per request phase by view.')
+INGESTED_BYTES = Counter('chemflux_ingested_bytes_total', 'CSV bytes ingested by uploads and appends.')
+INGESTED_ROWS = Counter('chemflux_ingested_rows_total', 'CSV rows ingested by uploads and appends.')
+INGEST_ROWS_PER_SECOND = Histogram(
+    'chemflux_ingest_rows_per_second', 'Parse and summary throughput of synchronous ingests.', RATE_BUCKETS,
+)
+METRICS = [REQUESTS, REQUEST_SECONDS, PHASE_SECONDS, INGESTED_BYTES, INGESTED_ROWS, INGEST_ROWS_PER_SECOND]
+
+
+@contextmanager
+def phase(name):
+    """Time a block as phase ``name`` of the current request. Repeated
+    blocks with the same name add up; outside a request this is a no-op."""
+    phases = _phases.get()
+    if phases is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def phase_seconds(*names):
+    phases = _phases.get() or {}
+    return sum(phases.get(name, 0.0) for name in names)
+
+
+def record_ingest(size, rows, seconds=None):
+    INGESTED_BYTES.inc(size)
+    INGESTED_ROWS.inc(rows)
+    if seconds:
+        INGEST_ROWS_PER_SECOND.observe(rows / seconds)
+
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+class ServerTimingMiddleware:
+    """Collects the phases timed with ``phase()`` during a request, reports
+    them in a ``Server-Timing`` header and feeds the metrics above. Works
+    under WSGI and ASGI; the phases live in a context variable, so
+    concurrent async requests keep theirs apart."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        phases = {}
+        token = _phases.set(phases)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _phases.reset(token)
+        return self.finish(request, response, phases, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        phases = {}
+        token = _phases.set(phases)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _phases.reset(token)
+        return self.finish(request, response, phases, time.perf_counter() - start)
+
+    def finish(self, request, response, phases, total):
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else 'unmatched'
+        REQUESTS.inc(view=view, method=request.method, status=str(response.status_code))
+        REQUEST_SECONDS.observe(total, view=view)
+        for name, seconds in phases.items():
+            PHASE_SECONDS.observe(seconds, view=view, phase=name)
+
+        entries = [f'{name};dur={seconds * 1000:.1f}' for name, seconds in phases.items()]
+        entries.append(f'total;dur={total * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(entries)
+        return response
@@ -0,0 +1,39 @@
+import hashlib
+
+from django.core.files.uploadhandler import FileUploadHandler
+
+HASH_ALGORITHM = 'sha256'
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """Hashes each uploaded file as it streams in and passes the bytes on
+    unchanged to the next handler. Digests land in ``request.upload_digests``
+    keyed by form field name."""
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.hasher = hashlib.new(HASH_ALGORITHM)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.request is not None:
+            if not hasattr(self.request, 'upload_digests'):
+                self.request.upload_digests = {}
+            self.request.upload_digests[self.field_name] = self.hasher.hexdigest()
+        return None
+
+
+def file_digest(request, field_name):
+    digest = getattr(request, 'upload_digests', {}).get(field_name)
+    if digest:
+        return digest
+    # Handler not installed: fall back to hashing the stored upload.
+    uploaded_file = request.FILES[field_name]
+    hasher = hashlib.new(HASH_ALGORITHM)
+    for chunk in uploaded_file.chunks():
+        hasher.update(chunk)
+    uploaded_file.seek(0)
+    return hasher.hexdigest()
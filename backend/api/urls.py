@@ -1,10 +1,32 @@
+from django.conf import settings
 from django.urls import path
+from rest_framework.authtoken.views import obtain_auth_token
+
 from . import views
 
+if settings.ASYNC_VIEWS:
+    from . import async_views as read_views
+else:
+    read_views = views
+
 urlpatterns = [
-    path('ping/', views.PingView.as_view(), name='ping'),
+    path('ping/', read_views.PingView.as_view(), name='ping'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
+    path('auth/token/', obtain_auth_token, name='auth-token'),
+    path('auth/logout/', views.RevokeTokenView.as_view(), name='auth-logout'),
     path('upload/', views.UploadCSVView.as_view(), name='upload'),
-    path('datasets/', views.DatasetListView.as_view(), name='datasets'),
-    path('datasets/<int:pk>/', views.DatasetDetailView.as_view(), name='dataset-detail'),
-    path('datasets/<int:pk>/report/', views.DatasetReportView.as_view(), name='dataset-report'),
+    path('uploads/', views.ChunkedUploadCreateView.as_view(), name='chunked-uploads'),
+    path('uploads/<int:pk>/', views.ChunkedUploadDetailView.as_view(), name='chunked-upload-detail'),
+    path('uploads/<int:pk>/complete/', views.ChunkedUploadCompleteView.as_view(), name='chunked-upload-complete'),
+    path('jobs/<int:pk>/', views.IngestJobDetailView.as_view(), name='job-detail'),
+    path('datasets/', read_views.DatasetListView.as_view(), name='datasets'),
+    path('datasets/compare/', views.DatasetCompareView.as_view(), name='dataset-compare'),
+    path('datasets/<int:pk>/', read_views.DatasetDetailView.as_view(), name='dataset-detail'),
+    path('datasets/<int:pk>/append/', views.DatasetAppendView.as_view(), name='dataset-append'),
+    path('datasets/<int:pk>/records/', views.DatasetRecordsView.as_view(), name='dataset-records'),
+    path('datasets/<int:pk>/rows/', views.DatasetRowsView.as_view(), name='dataset-rows'),
+    path('datasets/<int:pk>/stats/', views.DatasetStatsView.as_view(), name='dataset-stats'),
+    path('datasets/<int:pk>/chart/', views.DatasetChartView.as_view(), name='dataset-chart'),
+    path('datasets/<int:pk>/report/', read_views.DatasetReportView.as_view(), name='dataset-report'),
+    path('records/aggregate/', views.RecordAggregateView.as_view(), name='record-aggregate'),
 ]
@@ -1,16 +1,56 @@
-import io
-from django.http import HttpResponse
+import hashlib
+
+from django.conf import settings
+from django.db import OperationalError
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-import pandas as pd
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework import permissions, status
+from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.views import APIView
 
-from .models import Dataset
-from .serializers import DatasetSerializer
+from .authentication import forget_token
+from .charts import ChartError, downsample, histogram, parse_bins
+from .chunked import (
+    ChunkedUploadError,
+    UploadConflict,
+    assemble,
+    create_upload,
+    discard_upload,
+    mark_completed,
+    write_chunk,
+)
+from .columnar import ColumnarWriter, dataset_store
+from .compare import CompareError, compare, parse_ids
+from .ingest import (
+    AppendError,
+    SummaryBuilder,
+    append_rows,
+    find_duplicate,
+    save_dataset,
+    save_duplicate,
+    summarize_csv,
+)
+from .jobs import schedule_records, schedule_retention, submit_ingest_job
+from .models import ChunkedUpload, Dataset, IngestJob
+from .parsing import CSVParser
+from .records import RecordsError, aggregate_records, loaded_rows
+from .reports import get_report
+from .serializers import ChunkedUploadSerializer, DatasetSerializer, IngestJobSerializer
+from .stats import StatsError, group_stats, parse_metrics, resolve_group_by
+from .timing import phase, phase_seconds, record_ingest, render_metrics
+from .uploadhandlers import file_digest
+
+
+class MetricsView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 class PingView(APIView):
@@ -20,122 +60,394 @@ class PingView(APIView):
         return Response({'status': 'ok', 'time': timezone.now()})
 
 
+class RevokeTokenView(APIView):
+    def post(self, request):
+        if isinstance(request.auth, Token):
+            forget_token(request.auth.key)
+            request.auth.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def is_async(request):
+    flag = request.query_params.get('async')
+    if flag is None:
+        return settings.INGEST_ASYNC
+    return flag.lower() in ('1', 'true', 'yes')
+
+
+def ingest_upload(request, name, uploaded_file, content_hash):
+    """Run the summary pipeline on an uploaded CSV, or hand it to the worker
+    pool. Returns the resulting Dataset or IngestJob (None if the CSV was
+    rejected) and the response to send."""
+    with phase('db'):
+        original = find_duplicate(content_hash)
+    if original is not None:
+        with phase('db'):
+            dataset = save_duplicate(name, original)
+        with phase('records'):
+            schedule_records(dataset.id, original.id)
+        with phase('retention'):
+            schedule_retention()
+        with phase('serialize'):
+            data = DatasetSerializer(dataset).data
+        return dataset, Response(data, status=status.HTTP_201_CREATED)
+
+    if is_async(request):
+        job = submit_ingest_job(name, uploaded_file, content_hash)
+        data = IngestJobSerializer(job).data
+        data['status_url'] = reverse('job-detail', args=[job.id], request=request)
+        return job, Response(data, status=status.HTTP_202_ACCEPTED)
+
+    builder = SummaryBuilder()
+    writer = ColumnarWriter()
+    parser = CSVParser()
+    try:
+        summary = summarize_csv(uploaded_file, consumers=[writer], builder=builder, parser=parser)
+    except Exception as e:
+        writer.abort()
+        return None, Response({'detail': f'Invalid CSV: {e}'}, status=400)
+
+    record_ingest(uploaded_file.size, summary['total_count'], phase_seconds('parse', 'aggregate'))
+
+    try:
+        with phase('db'):
+            dataset = save_dataset(
+                name, uploaded_file, summary, content_hash, uploaded_file.size, builder.state(), parser.stats(),
+            )
+        with phase('columnar'):
+            writer.commit(dataset.csv_file.name)
+    except BaseException:
+        writer.abort()
+        raise
+    with phase('records'):
+        schedule_records(dataset.id)
+    with phase('retention'):
+        schedule_retention()
+    with phase('serialize'):
+        data = DatasetSerializer(dataset).data
+    return dataset, Response(data, status=status.HTTP_201_CREATED)
+
+
 class UploadCSVView(APIView):
     def post(self, request, *args, **kwargs):
         uploaded_file = request.FILES.get('file')
         if not uploaded_file:
             return Response({'detail': 'No file provided. Use key "file".'}, status=400)
+        name = getattr(uploaded_file, 'name', f'dataset_{timezone.now().isoformat()}')
+        with phase('hash'):
+            content_hash = file_digest(request, 'file')
+        return ingest_upload(request, name, uploaded_file, content_hash)[1]
+
+
+class ChunkedUploadCreateView(APIView):
+    def post(self, request):
         try:
-            df = pd.read_csv(uploaded_file)
-        except Exception as e:
-            return Response({'detail': f'Invalid CSV: {e}'}, status=400)
-
-        df.columns = [c.strip() for c in df.columns]
-        total_count = int(len(df))
-
-        numeric_cols = df.select_dtypes(include='number').columns.tolist()
-        averages = {col: round(float(df[col].mean()), 2) for col in numeric_cols}
-
-        type_col = None
-        for candidate in ['Type', 'type', 'Equipment Type', 'equipment_type']:
-            if candidate in df.columns:
-                type_col = candidate
-                break
-        if type_col:
-            type_dist = df[type_col].astype(str).value_counts(dropna=False).to_dict()
+            upload = create_upload(
+                request.data.get('name'),
+                request.data.get('size'),
+                request.data.get('chunk_size'),
+                request.data.get('sha256'),
+            )
+        except ChunkedUploadError as e:
+            return Response({'detail': str(e)}, status=400)
+        data = ChunkedUploadSerializer(upload).data
+        data['upload_url'] = reverse('chunked-upload-detail', args=[upload.id], request=request)
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class ChunkedUploadDetailView(APIView):
+    def get(self, request, pk):
+        upload = get_object_or_404(ChunkedUpload, pk=pk)
+        return Response(ChunkedUploadSerializer(upload).data)
+
+    def put(self, request, pk):
+        upload = get_object_or_404(ChunkedUpload, pk=pk)
+        try:
+            with phase('store'):
+                index = write_chunk(
+                    upload, request.query_params.get('offset'), request.stream, request.headers.get('Content-Encoding'),
+                )
+        except UploadConflict as e:
+            return Response({'detail': str(e)}, status=status.HTTP_409_CONFLICT)
+        except ChunkedUploadError as e:
+            return Response({'detail': str(e)}, status=400)
+        return Response({'index': index, 'offset': index * upload.chunk_size})
+
+    def delete(self, request, pk):
+        upload = get_object_or_404(ChunkedUpload, pk=pk)
+        discard_upload(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ChunkedUploadCompleteView(APIView):
+    def post(self, request, pk):
+        upload = get_object_or_404(ChunkedUpload, pk=pk)
+        if upload.completed_at is not None:
+            # Repeated call, e.g. after the first response was lost.
+            if upload.dataset_id is not None:
+                return Response(DatasetSerializer(upload.dataset).data)
+            if upload.job_id is not None:
+                return Response(IngestJobSerializer(upload.job).data, status=status.HTTP_202_ACCEPTED)
+            return Response({'detail': 'The dataset from this upload no longer exists.'}, status=410)
+        try:
+            with phase('assemble'):
+                assembled, content_hash = assemble(upload)
+        except UploadConflict as e:
+            return Response({'detail': str(e)}, status=status.HTTP_409_CONFLICT)
+        except ChunkedUploadError as e:
+            return Response({'detail': str(e)}, status=400)
+
+        try:
+            result, response = ingest_upload(request, upload.name, assembled, content_hash)
+        finally:
+            # Moved into place when a dataset or job took the file.
+            assembled.discard()
+        if result is None:
+            discard_upload(upload)
+        elif isinstance(result, IngestJob):
+            mark_completed(upload, job=result)
         else:
-            type_dist = {}
-
-        preview_rows = df.head(10).to_dict(orient='records')
-
-        summary = {
-            'total_count': total_count,
-            'averages': averages,
-            'type_distribution': type_dist,
-            'columns': df.columns.tolist(),
-            'preview': preview_rows,
-        }
-
-        dataset = Dataset.objects.create(
-            name=getattr(uploaded_file, 'name', f'dataset_{timezone.now().isoformat()}'),
-            csv_file=uploaded_file,
-            summary=summary,
-        )
+            mark_completed(upload, dataset=result)
+        return response
+
 
-        ids_to_keep = list(Dataset.objects.order_by('-uploaded_at').values_list('id', flat=True)[:5])
-        if len(ids_to_keep) >= 5:
-            Dataset.objects.exclude(id__in=ids_to_keep).delete()
+def not_modified_response(request, etag, last_modified=None):
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        response['ETag'] = etag
+    return response
 
-        return Response(DatasetSerializer(dataset).data, status=status.HTTP_201_CREATED)
+
+def datasets_etag(rows, fields, variant=''):
+    """Strong validator for a set of datasets from their (id, updated_at)
+    pairs, which change whenever a dataset's payload does. ``variant`` is
+    the negotiated format, so JSON and msgpack bodies differ."""
+    parts = [variant, ','.join(fields)] + [f'{pk}@{ts.isoformat()}' for pk, ts in rows]
+    digest = hashlib.sha1(';'.join(parts).encode('utf-8'))
+    return f'"{digest.hexdigest()}"'
+
+
+def requested_fields(request, default):
+    """Resolve ``?fields=a,b`` and ``?expand=summary`` against the
+    serializer's fields. Raises ValueError for unknown names."""
+    allowed = DatasetSerializer.Meta.fields
+    raw = request.query_params.get('fields')
+    fields = [f.strip() for f in raw.split(',') if f.strip()] if raw else list(default)
+    expand = request.query_params.get('expand')
+    if expand:
+        fields += [f.strip() for f in expand.split(',') if f.strip() and f.strip() not in fields]
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    return [f for f in allowed if f in fields]
+
+
+def without_unused_blobs(queryset, fields):
+    # stats_state is internal merge state and is never serialised.
+    return queryset.defer('stats_state') if 'summary' in fields else queryset.defer('summary', 'stats_state')
 
 
 class DatasetListView(APIView):
     def get(self, request):
-        datasets = Dataset.objects.order_by('-uploaded_at')[:5]
-        data = DatasetSerializer(datasets, many=True).data
-        return Response({'count': len(data), 'results': data})
+        try:
+            fields = requested_fields(request, DatasetSerializer.LIST_FIELDS)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=400)
+        datasets = without_unused_blobs(Dataset.objects.order_by('-uploaded_at'), fields)[:5]
+        with phase('db'):
+            etag = datasets_etag(datasets.values_list('id', 'updated_at'), fields, request.accepted_renderer.format)
+        not_modified = not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        with phase('db'):
+            datasets = list(datasets)
+        with phase('serialize'):
+            data = DatasetSerializer(datasets, many=True, fields=fields).data
+        return Response({'count': len(data), 'results': data}, headers={'ETag': etag, 'Vary': 'Accept'})
 
 
 class DatasetDetailView(APIView):
     def get(self, request, pk):
-        dataset = get_object_or_404(Dataset, pk=pk)
+        try:
+            fields = requested_fields(request, DatasetSerializer.Meta.fields)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=400)
+        with phase('db'):
+            rows = list(Dataset.objects.filter(pk=pk).values_list('id', 'updated_at'))
+        if not rows:
+            raise Http404
+        etag = datasets_etag(rows, fields, request.accepted_renderer.format)
+        not_modified = not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        with phase('db'):
+            dataset = get_object_or_404(without_unused_blobs(Dataset.objects.all(), fields), pk=pk)
+        with phase('serialize'):
+            data = DatasetSerializer(dataset, fields=fields).data
+        return Response(data, headers={'ETag': etag, 'Vary': 'Accept'})
+
+
+class DatasetCompareView(APIView):
+    def get(self, request):
+        try:
+            ids = parse_ids(request.query_params.get('ids'), settings.COMPARE_MAX_DATASETS)
+        except CompareError as e:
+            return Response({'detail': str(e)}, status=400)
+        datasets = list(Dataset.objects.filter(pk__in=ids))
+        missing = sorted(set(ids) - {d.id for d in datasets})
+        if missing:
+            return Response({'detail': f'Unknown datasets: {", ".join(map(str, missing))}'}, status=404)
+        return Response(compare(datasets))
+
+
+class RecordAggregateView(APIView):
+    def get(self, request):
+        params = request.query_params
+        try:
+            with phase('db'):
+                result = aggregate_records(
+                    params.get('group_by'), params.get('metrics'), params.get('parameters'),
+                    params.get('datasets'), params.get('type'),
+                )
+        except RecordsError as e:
+            return Response({'detail': str(e)}, status=400)
+        return Response(result)
+
+
+class DatasetAppendView(APIView):
+    def post(self, request, pk):
+        dataset = get_object_or_404(Dataset.objects.defer('summary', 'stats_state'), pk=pk)
+        uploaded_file = request.FILES.get('file')
+        if not uploaded_file:
+            return Response({'detail': 'No file provided. Use key "file".'}, status=400)
+        try:
+            dataset = append_rows(dataset, uploaded_file)
+        except AppendError as e:
+            return Response({'detail': str(e)}, status=400)
+        except Dataset.DoesNotExist:
+            raise Http404
+        except OperationalError:
+            # SQLite stopped waiting for the write lock, e.g. held by another
+            # append to this dataset.
+            return Response(
+                {'detail': 'Dataset is busy, retry shortly.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '1'},
+            )
+        with phase('records'):
+            schedule_records(dataset.id)
         return Response(DatasetSerializer(dataset).data)
 
 
-class DatasetReportView(APIView):
+class DatasetRecordsView(APIView):
+    def get(self, request, pk):
+        dataset = get_object_or_404(Dataset.objects.only('id', 'records_status', 'summary'), pk=pk)
+        return Response({
+            'dataset': dataset.id,
+            'status': dataset.records_status or None,
+            'loaded': loaded_rows(dataset),
+            'total': dataset.summary.get('total_count', 0),
+        })
+
+
+class DatasetRowsView(APIView):
+    def get(self, request, pk):
+        dataset = get_object_or_404(Dataset, pk=pk)
+        try:
+            offset = int(request.query_params.get('offset', 0))
+            limit = int(request.query_params.get('limit', settings.ROWS_PAGE_DEFAULT))
+        except ValueError:
+            return Response({'detail': 'offset and limit must be integers.'}, status=400)
+        if offset < 0 or limit < 1:
+            return Response({'detail': 'offset must be >= 0 and limit >= 1.'}, status=400)
+        limit = min(limit, settings.ROWS_PAGE_MAX)
+
+        store = dataset_store(dataset)
+        columns = store.columns
+        requested = request.query_params.get('columns')
+        if requested:
+            columns = [c.strip() for c in requested.split(',') if c.strip()]
+            unknown = [c for c in columns if c not in store.specs]
+            if unknown:
+                return Response({'detail': f'Unknown columns: {", ".join(unknown)}'}, status=400)
+
+        stop = min(offset + limit, len(store))
+        return Response({
+            'count': len(store),
+            'offset': offset,
+            'limit': limit,
+            'columns': columns,
+            'results': store.records(columns, offset, stop) if offset < stop else [],
+        })
+
+
+class DatasetStatsView(APIView):
+    def get(self, request, pk):
+        dataset = get_object_or_404(Dataset, pk=pk)
+        store = dataset_store(dataset)
+        try:
+            metrics = parse_metrics(request.query_params.get('metrics'))
+            group_by = resolve_group_by(store, request.query_params.get('group_by'))
+        except StatsError as e:
+            return Response({'detail': str(e)}, status=400)
+        return Response(group_stats(store, group_by, metrics))
+
+
+class DatasetChartView(APIView):
     def get(self, request, pk):
         dataset = get_object_or_404(Dataset, pk=pk)
+        store = dataset_store(dataset)
+        column = request.query_params.get('column')
+        kind = request.query_params.get('kind', 'histogram')
+        if not column:
+            return Response({'detail': 'column is required.'}, status=400)
+        try:
+            if kind == 'histogram':
+                bins = parse_bins(request.query_params.get('bins'))
+                data = store.cached('histogram', [column, bins], lambda: histogram(store, column, bins))
+            elif kind == 'series':
+                try:
+                    max_points = int(request.query_params.get('max_points', settings.CHART_POINTS_DEFAULT))
+                except ValueError:
+                    return Response({'detail': 'max_points must be an integer.'}, status=400)
+                max_points = max(3, min(max_points, settings.CHART_POINTS_MAX))
+                data = store.cached('series', [column, max_points], lambda: downsample(store, column, max_points))
+            else:
+                return Response({'detail': 'kind must be "histogram" or "series".'}, status=400)
+        except ChartError as e:
+            return Response({'detail': str(e)}, status=400)
+        return Response(data)
+
 
-        buf = io.BytesIO()
-        p = canvas.Canvas(buf, pagesize=A4)
-        width, height = A4
-
-        y = height - 50
-        p.setFont("Helvetica-Bold", 16)
-        p.drawString(50, y, "ChemFlux Report")
-        y -= 25
-
-        p.setFont("Helvetica", 10)
-        p.drawString(50, y, f"Dataset: {dataset.name}")
-        y -= 15
-        p.drawString(50, y, f"Uploaded At: {dataset.uploaded_at.strftime('%Y-%m-%d %H:%M:%S')}")
-        y -= 25
-
-        p.setFont("Helvetica-Bold", 12)
-        p.drawString(50, y, "Summary")
-        y -= 18
-        p.setFont("Helvetica", 10)
-        summary = dataset.summary or {}
-        p.drawString(50, y, f"Total Count: {summary.get('total_count', 0)}")
-        y -= 15
-
-        averages = summary.get('averages', {})
-        p.drawString(50, y, "Averages:")
-        y -= 15
-        for k, v in averages.items():
-            p.drawString(70, y, f"- {k}: {v}")
-            y -= 14
-            if y < 80:
-                p.showPage()
-                y = height - 50
-                p.setFont("Helvetica", 10)
-
-        type_dist = summary.get('type_distribution', {})
-        p.drawString(50, y, "Type Distribution:")
-        y -= 15
-        for k, v in type_dist.items():
-            p.drawString(70, y, f"- {k}: {v}")
-            y -= 14
-            if y < 80:
-                p.showPage()
-                y = height - 50
-                p.setFont("Helvetica", 10)
-
-        p.showPage()
-        p.save()
-        pdf = buf.getvalue()
-        buf.close()
-
-        resp = HttpResponse(pdf, content_type='application/pdf')
-        resp['Content-Disposition'] = f'attachment; filename="chemflux_report_{dataset.id}.pdf"'
+class IngestJobDetailView(APIView):
+    def get(self, request, pk):
+        job = get_object_or_404(IngestJob, pk=pk)
+        return Response(IngestJobSerializer(job).data)
+
+
+def report_validators(dataset, path):
+    stat = path.stat()
+    return f'"{dataset.id}-{stat.st_mtime_ns:x}-{stat.st_size:x}"', int(stat.st_mtime)
+
+
+class DatasetReportView(APIView):
+    def get(self, request, pk):
+        with phase('db'):
+            dataset = get_object_or_404(Dataset, pk=pk)
+        with phase('report'):
+            path = get_report(dataset)
+        etag, last_modified = report_validators(dataset, path)
+
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        resp = FileResponse(
+            open(path, 'rb'),
+            as_attachment=True,
+            filename=f'chemflux_report_{dataset.id}.pdf',
+            content_type='application/pdf',
+        )
+        resp['ETag'] = etag
+        resp['Last-Modified'] = http_date(last_modified)
         return resp
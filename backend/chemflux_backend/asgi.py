@@ -2,5 +2,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chemflux_backend.settings')
+# Route the polling endpoints to the async views (see ASYNC_VIEWS).
+os.environ.setdefault('CHEMFLUX_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
+
+from api.jobs import start_retention_timer  # noqa: E402  (needs the app registry)
+
+start_retention_timer()
@@ -1,3 +1,5 @@
+import os
+from importlib.util import find_spec
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -14,11 +16,16 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
+    'rest_framework.authtoken',
     'corsheaders',
     'api',
 ]
 
 MIDDLEWARE = [
+    # First, so Server-Timing's total covers the rest of the stack.
+    'api.timing.ServerTimingMiddleware',
+    # Inside the timing middleware, so compression shows up as a phase.
+    'api.compression.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -82,14 +89,113 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Uploads are hashed while they stream in so repeated files can be detected
+# without re-reading them.
+FILE_UPLOAD_HANDLERS = [
+    'api.uploadhandlers.HashingUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Rows parsed per chunk when summarising uploads; bounds peak memory of the
+# parser regardless of file size. Set to 0 to parse the whole file at once.
+CSV_CHUNK_ROWS = 50_000
+
+# Text columns in the columnar store stay dictionary-encoded up to this many
+# distinct values; past it (names, ids) they are stored as plain UTF-8 so
+# ingest memory does not grow with the number of distinct values.
+COLUMNAR_MAX_CATEGORIES = 65_536
+# Hours a columnar scratch directory (MEDIA_ROOT/columnar/.tmp-*) may go
+# unwritten before retention treats it as left by a crashed ingest.
+COLUMNAR_SCRATCH_MAX_AGE_HOURS = 1
+
+# When True, /api/upload/ answers 202 with a job id and the summary is built
+# by a local process pool; clients can also opt in per request with ?async=1.
+INGEST_ASYNC = False
+INGEST_WORKERS = 2
+
+# Serve ping, dataset list/detail and reports with the async views in
+# api/async_views.py. asgi.py turns this on (CHEMFLUX_ASYNC_VIEWS=0 turns it
+# off again); under WSGI the sync views are cheaper. Async views run their
+# blocking work (report rendering, file reads) on ASYNC_WORKER_THREADS
+# threads and answer 503 once ASYNC_MAX_PENDING calls are running or queued.
+ASYNC_VIEWS = os.environ.get('CHEMFLUX_ASYNC_VIEWS') == '1'
+ASYNC_WORKER_THREADS = 4
+ASYNC_MAX_PENDING = 64
+
+# Chunked uploads (/api/uploads/): default and largest accepted chunk size,
+# and hours an upload may sit untouched before retention drops it with its
+# chunks (stored under MEDIA_ROOT/partial/).
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+UPLOAD_CHUNK_MAX = 64 * 1024 * 1024
+UPLOAD_MAX_AGE_HOURS = 24
+
+# Retention runs on the worker pool after uploads and every
+# RETENTION_INTERVAL seconds while a server (wsgi.py/asgi.py) is running (0
+# disables the timer; use the prune_datasets command from cron instead). A dataset is kept only while all configured
+# limits hold; None disables a limit.
+RETENTION_MAX_COUNT = 5
+RETENTION_MAX_AGE_DAYS = None
+RETENTION_MAX_TOTAL_BYTES = None
+RETENTION_BATCH_SIZE = 50
+RETENTION_INTERVAL = 300
+
+# Page sizes for /api/datasets/<id>/rows/.
+ROWS_PAGE_DEFAULT = 100
+ROWS_PAGE_MAX = 1000
+
+# Point budget for downsampled series from /api/datasets/<id>/chart/.
+CHART_POINTS_DEFAULT = 1000
+CHART_POINTS_MAX = 10_000
+
+# Upper bound on ?ids= for /api/datasets/compare/, and processes computing
+# uncached per-dataset statistics for it (a pool separate from
+# INGEST_WORKERS).
+COMPARE_MAX_DATASETS = 20
+COMPARE_WORKERS = 4
+
+# Load every row into the EquipmentRecord table after ingest, on the worker
+# pool, for /api/records/aggregate/. Rows are inserted (and deleted by
+# retention) RECORD_BATCH_ROWS per transaction, RECORD_BATCH_PAUSE seconds
+# apart, so uploads get the SQLite write lock between batches.
+EQUIPMENT_RECORDS = True
+RECORD_BATCH_ROWS = 10_000
+RECORD_BATCH_PAUSE = 0.05
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # orjson-backed JSON; msgpack for clients sending Accept: application/msgpack.
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        *(['api.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Resolved API tokens are cached so requests skip the token/user query.
+# Logout, deleting a token and saving its user evict the entry, but only in
+# the cache the change was made through: the default per-process cache
+# leaves other worker processes serving it until TOKEN_CACHE_TIMEOUT, so
+# keep that short, or set CHEMFLUX_REDIS_URL to share the cache between
+# workers (needs the redis package).
+TOKEN_CACHE_URL = os.environ.get('CHEMFLUX_REDIS_URL')
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'tokens': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': TOKEN_CACHE_URL,
+    } if TOKEN_CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tokens',
+    },
 }
+TOKEN_CACHE_TIMEOUT = 300 if TOKEN_CACHE_URL else 30
 
 CORS_ALLOW_ALL_ORIGINS = True
 CSRF_TRUSTED_ORIGINS = [
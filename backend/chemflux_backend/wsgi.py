@@ -4,3 +4,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chemflux_backend.settings')
 
 application = get_wsgi_application()
+
+from api.jobs import start_retention_timer  # noqa: E402  (needs the app registry)
+
+start_retention_timer()
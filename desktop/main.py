@@ -1,20 +1,596 @@
 import sys
 import os
+import gzip
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import requests
+from requests.adapters import HTTPAdapter
 from PyQt5 import QtWidgets, QtCore
+from PyQt5.QtCore import (
+    QAbstractTableModel, QModelIndex, QObject, QRunnable, QStandardPaths, Qt, QThreadPool, QTimer, pyqtSignal
+)
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QLineEdit, QPushButton, QListWidget, QFileDialog,
-    QTableWidget, QTableWidgetItem, QGroupBox, QFrame, QDialog,
-    QDialogButtonBox, QHeaderView, QSizePolicy, QStackedWidget
+    QTableView, QGroupBox, QFrame, QDialog,
+    QDialogButtonBox, QHeaderView, QProgressBar, QSizePolicy, QStackedWidget
 )
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 
 API_BASE = os.environ.get('CHEMFLUX_API', 'http://127.0.0.1:8000/api')
+CACHE_MAX_BYTES = int(os.environ.get('CHEMFLUX_CACHE_MB', '200')) * 1024 * 1024
+HISTORY_FIELDS = 'id,name,uploaded_at,updated_at'
+UPLOAD_CHUNK_BYTES = int(os.environ.get('CHEMFLUX_UPLOAD_CHUNK_MB', '8')) * 1024 * 1024
+UPLOAD_PARALLEL = int(os.environ.get('CHEMFLUX_UPLOAD_PARALLEL', '4'))
+UPLOAD_GZIP = os.environ.get('CHEMFLUX_UPLOAD_GZIP', '1') != '0'
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def make_session(pool_size=8):
+    """One keep-alive connection pool for every API call. Asks for msgpack
+    when it is installed (JSON otherwise); requests already negotiates gzip,
+    and brotli too when the brotli package is installed."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if msgpack is not None:
+        session.headers['Accept'] = 'application/msgpack, application/json;q=0.9'
+    else:
+        session.headers['Accept'] = 'application/json'
+    return session
+
+
+SESSION = make_session()
+
+
+def decode_response(r):
+    if msgpack is not None and r.headers.get('Content-Type', '').startswith('application/msgpack'):
+        return msgpack.unpackb(r.content)
+    return r.json()
+
+
+class TokenAuth(requests.auth.AuthBase):
+    def __init__(self, token):
+        self.token = token
+
+    def __call__(self, r):
+        r.headers['Authorization'] = f'Token {self.token}'
+        return r
+
+
+def obtain_token(username, password):
+    """Exchange credentials for an API token; returns None if rejected."""
+    r = SESSION.post(f"{API_BASE}/auth/token/", data={'username': username, 'password': password}, timeout=10)
+    if r.status_code == 200:
+        return decode_response(r).get('token')
+    if r.status_code == 400:
+        return None
+    r.raise_for_status()
+
+
+class DatasetCache:
+    """On-disk LRU cache of dataset detail JSON and report PDFs.
+
+    Entries are keyed by dataset id and version (``updated_at``, which
+    changes when rows are appended), so a hit never needs a round trip. The
+    newest copy of each dataset also serves as an offline fallback. Least
+    recently used files go once the total passes ``max_bytes``.
+    """
+
+    INDEX = 'index.json'
+
+    def __init__(self, root, max_bytes=CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        try:
+            with open(os.path.join(root, self.INDEX), encoding='utf-8') as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+        # Drop entries whose file went missing.
+        self.index = {n: e for n, e in self.index.items() if os.path.exists(os.path.join(root, n))}
+
+    @staticmethod
+    def filename(ds_id, version, kind):
+        return f"{ds_id}-{re.sub(r'[^0-9A-Za-z]+', '', version or '')}.{kind}"
+
+    def _save_index(self):
+        tmp = os.path.join(self.root, f'.{self.INDEX}')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f)
+        os.replace(tmp, os.path.join(self.root, self.INDEX))
+
+    def _read(self, name):
+        try:
+            with open(os.path.join(self.root, name), 'rb') as f:
+                data = f.read()
+        except OSError:
+            self.index.pop(name, None)
+            return None
+        self.index[name]['accessed'] = time.time()
+        self._save_index()
+        return data
+
+    def _remove(self, name):
+        self.index.pop(name, None)
+        try:
+            os.remove(os.path.join(self.root, name))
+        except OSError:
+            pass
+
+    def get(self, ds_id, version, kind):
+        name = self.filename(ds_id, version, kind)
+        with self.lock:
+            return self._read(name) if name in self.index else None
+
+    def latest(self, ds_id, kind):
+        """Newest cached copy of a dataset whatever its version."""
+        with self.lock:
+            names = [n for n, e in self.index.items() if e['id'] == ds_id and e['kind'] == kind]
+            if not names:
+                return None
+            return self._read(max(names, key=lambda n: self.index[n]['version']))
+
+    def put(self, ds_id, version, kind, data, meta=None):
+        name = self.filename(ds_id, version, kind)
+        with self.lock:
+            # Older versions of the same dataset are dead weight.
+            for other in [n for n, e in self.index.items() if e['id'] == ds_id and e['kind'] == kind]:
+                self._remove(other)
+            tmp = os.path.join(self.root, f'.{name}')
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, os.path.join(self.root, name))
+            self.index[name] = {
+                'id': ds_id, 'version': version or '', 'kind': kind,
+                'size': len(data), 'accessed': time.time(), 'meta': meta or {},
+            }
+            total = sum(e['size'] for e in self.index.values())
+            for old in sorted(self.index, key=lambda n: self.index[n]['accessed']):
+                if total <= self.max_bytes or old == name:
+                    continue
+                total -= self.index[old]['size']
+                self._remove(old)
+            self._save_index()
+
+    def datasets(self):
+        """Metadata of cached datasets, most recently used first."""
+        with self.lock:
+            entries = [e for e in self.index.values() if e['kind'] == 'json']
+        entries.sort(key=lambda e: e['accessed'], reverse=True)
+        return [e['meta'] for e in entries if e['meta']]
+
+
+def dataset_version(data):
+    return data.get('updated_at') or data.get('uploaded_at') or ''
+
+
+def default_cache_dir():
+    base = QStandardPaths.writableLocation(QStandardPaths.CacheLocation)
+    return os.environ.get('CHEMFLUX_CACHE_DIR') or os.path.join(base or os.path.expanduser('~/.cache'), 'chemflux')
+
+
+class ChunkedUploader:
+    """Uploads a CSV through /uploads/ in chunks sent in parallel.
+
+    The upload id is kept in ``state_dir`` per file (path, size and mtime),
+    so after a failure or a restart only the chunks the server is missing
+    are sent again. Each chunk is retried a few times with backoff before
+    the upload gives up.
+    """
+
+    RETRIES = 3
+    JOB_POLL_SECONDS = 1.0
+
+    def __init__(self, auth, state_dir, chunk_size=UPLOAD_CHUNK_BYTES, parallel=UPLOAD_PARALLEL, compress=UPLOAD_GZIP):
+        self.auth = auth
+        self.state_dir = state_dir
+        self.chunk_size = chunk_size
+        self.parallel = max(1, parallel)
+        self.compress = compress
+        os.makedirs(state_dir, exist_ok=True)
+
+    def _state_file(self, path, stat):
+        key = f'{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}'
+        return os.path.join(self.state_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    @staticmethod
+    def _sha256(path):
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            while block := f.read(1024 * 1024):
+                hasher.update(block)
+        return hasher.hexdigest()
+
+    def _resume(self, state_file, size):
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                upload_id = json.load(f)['id']
+        except (OSError, ValueError, KeyError):
+            return None
+        r = SESSION.get(f"{API_BASE}/uploads/{upload_id}/", auth=self.auth, timeout=10)
+        if r.status_code == 404:
+            # Expired on the server; start over.
+            os.remove(state_file)
+            return None
+        r.raise_for_status()
+        info = decode_response(r)
+        return info if info['size'] == size else None
+
+    def _start(self, path, state_file, size):
+        payload = {
+            'name': os.path.basename(path),
+            'size': size,
+            'chunk_size': self.chunk_size,
+            'sha256': self._sha256(path),
+        }
+        r = SESSION.post(f"{API_BASE}/uploads/", json=payload, auth=self.auth, timeout=10)
+        r.raise_for_status()
+        info = decode_response(r)
+        with open(state_file, 'w', encoding='utf-8') as f:
+            json.dump({'id': info['id'], 'path': os.path.abspath(path)}, f)
+        return info
+
+    def _put(self, path, upload_id, offset, length):
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            body = f.read(length)
+        headers = {'Content-Type': 'application/octet-stream'}
+        if self.compress:
+            body = gzip.compress(body, compresslevel=1)
+            headers['Content-Encoding'] = 'gzip'
+        url = f"{API_BASE}/uploads/{upload_id}/?offset={offset}"
+        for attempt in range(self.RETRIES + 1):
+            try:
+                r = SESSION.put(url, data=body, headers=headers, auth=self.auth, timeout=(10, 60))
+            except requests.RequestException:
+                if attempt == self.RETRIES:
+                    raise
+            else:
+                if r.status_code < 500 or attempt == self.RETRIES:
+                    r.raise_for_status()
+                    return length
+            time.sleep(2 ** attempt)
+
+    def _send_chunks(self, path, info, progress):
+        size, chunk_size = info['size'], info['chunk_size']
+        received = set(info['received'])
+        sent = info['received_bytes']
+        progress(('upload', sent, size))
+        pool = ThreadPoolExecutor(self.parallel)
+        try:
+            futures = [
+                pool.submit(self._put, path, info['id'], offset, min(chunk_size, size - offset))
+                for index, offset in enumerate(range(0, size, chunk_size)) if index not in received
+            ]
+            for future in as_completed(futures):
+                sent += future.result()
+                progress(('upload', sent, size))
+        finally:
+            # On failure or cancel, drop the chunks that have not started.
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _finish(self, upload_id, progress):
+        r = SESSION.post(f"{API_BASE}/uploads/{upload_id}/complete/?async=1", auth=self.auth, timeout=60)
+        if r.status_code >= 400:
+            detail = decode_response(r).get('detail', r.status_code) if r.content else r.status_code
+            raise RuntimeError(f'Upload failed: {detail}')
+        data = decode_response(r)
+        if r.status_code != 202:
+            return data
+        # Parsed on the server's worker pool; follow the job.
+        while data['status'] not in ('done', 'failed'):
+            progress(('process', data.get('progress', 0.0)))
+            time.sleep(self.JOB_POLL_SECONDS)
+            r = SESSION.get(f"{API_BASE}/jobs/{data['id']}/", auth=self.auth, timeout=10)
+            r.raise_for_status()
+            data = decode_response(r)
+        if data['status'] == 'failed':
+            raise RuntimeError(f"Processing failed: {data.get('error')}")
+        r = SESSION.get(f"{API_BASE}/datasets/{data['dataset']}/", auth=self.auth, timeout=30)
+        r.raise_for_status()
+        return decode_response(r)
+
+    def upload(self, path, progress=lambda value: None):
+        """Upload ``path`` and return the dataset detail. ``progress`` gets
+        ``('upload', sent_bytes, total_bytes)`` while chunks go out and
+        ``('process', fraction)`` while the server parses the file."""
+        stat = os.stat(path)
+        state_file = self._state_file(path, stat)
+        info = self._resume(state_file, stat.st_size) or self._start(path, state_file, stat.st_size)
+        if info.get('completed_at') is None:
+            self._send_chunks(path, info, progress)
+        data = self._finish(info['id'], progress)
+        try:
+            os.remove(state_file)
+        except OSError:
+            pass
+        return data
+
+
+class TaskSignals(QObject):
+    # task id, succeeded, result or error message
+    done = pyqtSignal(int, bool, object)
+    # task id, progress value reported by the task
+    progress = pyqtSignal(int, object)
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+class ApiTask(QRunnable):
+    def __init__(self, task_id, fn, args, signals, reports_progress=False):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.task_id = task_id
+        self.fn = fn
+        self.args = args
+        self.signals = signals
+        self.reports_progress = reports_progress
+        self.cancelled = False
+
+    def report(self, value):
+        # Long tasks call this between steps; it is also where they stop
+        # once cancelled.
+        if self.cancelled:
+            raise TaskCancelled()
+        self.signals.progress.emit(self.task_id, value)
+
+    def run(self):
+        if self.cancelled:
+            self.signals.done.emit(self.task_id, False, None)
+            return
+        try:
+            if self.reports_progress:
+                result = self.fn(*self.args, progress=self.report)
+            else:
+                result = self.fn(*self.args)
+        except Exception as e:
+            self.signals.done.emit(self.task_id, False, str(e))
+        else:
+            self.signals.done.emit(self.task_id, True, result)
+
+
+class ApiWorker(QObject):
+    """Runs blocking API calls on a thread pool and hands results back to
+    callbacks on the GUI thread.
+
+    Tasks submitted with the same ``key`` coalesce: a newer one cancels the
+    older, which is dropped from the queue if it has not started and has its
+    result discarded if it has. Tasks submitted with ``on_progress`` get a
+    ``progress`` keyword argument to report through.
+    """
+
+    def __init__(self, parent=None, max_threads=4):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        # Created on the GUI thread, so emits from workers are queued here.
+        self.signals = TaskSignals()
+        self.signals.done.connect(self._dispatch)
+        self.signals.progress.connect(self._progress)
+        self.tasks = {}
+        self.keys = {}
+        self.next_id = 0
+
+    def submit(self, fn, *args, on_success=None, on_error=None, on_progress=None, key=None):
+        if key is not None:
+            self.cancel(key)
+        self.next_id += 1
+        task = ApiTask(self.next_id, fn, args, self.signals, reports_progress=on_progress is not None)
+        self.tasks[task.task_id] = (task, on_success, on_error, on_progress, key)
+        if key is not None:
+            self.keys[key] = task.task_id
+        self.pool.start(task)
+        return task.task_id
+
+    def _cancel_task(self, task_id):
+        task = self.tasks[task_id][0]
+        task.cancelled = True
+        # A task that already started stays referenced until it reports
+        # back, so Python does not free it under the running thread.
+        if self.pool.tryTake(task):
+            del self.tasks[task_id]
+
+    def cancel(self, key):
+        task_id = self.keys.pop(key, None)
+        if task_id in self.tasks:
+            self._cancel_task(task_id)
+
+    def cancel_all(self):
+        self.keys.clear()
+        for task_id in list(self.tasks):
+            self._cancel_task(task_id)
+
+    def busy(self, key):
+        return key in self.keys
+
+    def _dispatch(self, task_id, ok, payload):
+        entry = self.tasks.pop(task_id, None)
+        if entry is None:
+            return
+        task, on_success, on_error, _, key = entry
+        if task.cancelled:
+            # Cancelled or superseded while in flight.
+            return
+        if key is not None and self.keys.get(key) == task_id:
+            del self.keys[key]
+        callback = on_success if ok else on_error
+        if callback is not None:
+            callback(payload)
+
+    def _progress(self, task_id, value):
+        entry = self.tasks.get(task_id)
+        if entry is None or entry[0].cancelled or entry[3] is None:
+            return
+        entry[3](value)
+
+
+def display(value):
+    return '' if value is None else str(value)
+
+
+class ListTableModel(QAbstractTableModel):
+    """Read-only table over a list of row tuples."""
+
+    def __init__(self, headers, parent=None):
+        super().__init__(parent)
+        self.headers = list(headers)
+        self.rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        return display(self.rows[index.row()][index.column()])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.headers[section] if section < len(self.headers) else None
+        return str(section + 1)
+
+    def set_rows(self, rows, headers=None):
+        self.beginResetModel()
+        if headers is not None:
+            self.headers = list(headers)
+        self.rows = [tuple(row) for row in rows]
+        self.endResetModel()
+
+
+class RemoteRowsModel(ListTableModel):
+    """All rows of a dataset, fetched a page at a time from
+    /datasets/<id>/rows/ as the view scrolls to them. Only the most recently
+    used pages are kept; the summary preview fills in while the first page
+    loads (or if the backend cannot serve rows)."""
+
+    PAGE_ROWS = 200
+    MAX_PAGES = 50
+    PLACEHOLDER = '…'
+
+    def __init__(self, api, fetch, parent=None):
+        super().__init__([], parent)
+        self.api = api
+        self.fetch = fetch
+        self.ds_id = None
+        self.total = 0
+        self.preview = []
+        self.pages = OrderedDict()
+        self.inflight = set()
+        self.generation = 0
+        self.on_error = None
+
+    def load(self, ds_id, columns, total, preview=()):
+        for page in self.inflight:
+            self.api.cancel(f'rows:{page}')
+        self.beginResetModel()
+        self.generation += 1
+        self.ds_id = ds_id
+        self.headers = list(columns)
+        self.total = total
+        self.preview = [tuple(row.get(c) for c in self.headers) for row in preview]
+        self.pages = OrderedDict()
+        self.inflight = set()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.total
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        row = index.row()
+        page, offset = divmod(row, self.PAGE_ROWS)
+        rows = self.pages.get(page)
+        if rows is not None:
+            self.pages.move_to_end(page)
+            return display(rows[offset][index.column()]) if offset < len(rows) else None
+        self._request(page)
+        if row < len(self.preview):
+            return display(self.preview[row][index.column()])
+        return self.PLACEHOLDER
+
+    def _request(self, page):
+        if self.ds_id is None or page in self.inflight:
+            return
+        self.inflight.add(page)
+        generation = self.generation
+        self.api.submit(
+            self.fetch, self.ds_id, page * self.PAGE_ROWS, self.PAGE_ROWS,
+            on_success=lambda data: self._page_loaded(generation, page, data),
+            on_error=lambda message: self._page_failed(generation, page, message),
+            key=f'rows:{page}',
+        )
+
+    def _page_loaded(self, generation, page, data):
+        if generation != self.generation:
+            return
+        self.inflight.discard(page)
+        self.pages[page] = [tuple(row.get(c) for c in self.headers) for row in data.get('results', [])]
+        while len(self.pages) > self.MAX_PAGES:
+            self.pages.popitem(last=False)
+        first = page * self.PAGE_ROWS
+        last = min(first + self.PAGE_ROWS, self.total) - 1
+        if last >= first:
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(self.headers) - 1))
+
+    def _page_failed(self, generation, page, message):
+        if generation != self.generation:
+            return
+        self.inflight.discard(page)
+        # Fall back to the preview rather than retrying on every repaint.
+        self.pages[page] = []
+        if page == 0 and self.preview:
+            self.pages[page] = list(self.preview)
+        if self.on_error is not None:
+            self.on_error(message)
+
+
+def nice_limits(values):
+    """Y limits rounded out to 1/2/5 steps, so similar datasets share axes
+    and can be redrawn by blitting only the bars."""
+    def nice(x):
+        if x <= 0:
+            return 0.0
+        step = 10 ** math.floor(math.log10(x))
+        for m in (1, 2, 5, 10):
+            if x <= m * step:
+                return m * step
+        return 10 * step
+
+    hi = nice(max(max(values), 0) * 1.1)
+    lo = -nice(-min(min(values), 0) * 1.1)
+    return (lo, hi) if hi > lo else (0.0, 1.0)
 
 
 class ChartCanvas(FigureCanvas):
+    """Bar and pie charts that update their existing artists in place when
+    the categories stay the same. Those artists are animated: a full draw
+    caches the static background, and updates only restore it and blit the
+    changed artists."""
+
     def __init__(self):
         self.fig = Figure(figsize=(5, 3), tight_layout=True)
         super().__init__(self.fig)
@@ -23,13 +599,52 @@ class ChartCanvas(FigureCanvas):
         self.ax = self.fig.add_subplot(111)
         self.ax.set_facecolor('#0b1020')
         self.ax.tick_params(colors='#94a3b8')
+        self.kind = None
+        self.labels = None
+        self.ylim = None
+        self.wedges = []
+        self.bars = []
+        self.pct_texts = []
+        self.background = None
+        self.mpl_connect('draw_event', self._on_draw)
 
-    def plot_bar(self, data):
+    def _animated(self):
+        return [*self.bars, *self.wedges, *self.pct_texts]
+
+    def _on_draw(self, event):
+        self.background = self.copy_from_bbox(self.fig.bbox)
+        for artist in self._animated():
+            self.fig.draw_artist(artist)
+
+    def _blit(self):
+        if self.background is None:
+            self.draw()
+            return
+        self.restore_region(self.background)
+        for artist in self._animated():
+            self.fig.draw_artist(artist)
+        self.blit(self.fig.bbox)
+
+    def _reset(self):
         self.ax.clear()
+        self.kind = self.labels = self.ylim = None
+        self.bars, self.wedges, self.pct_texts = [], [], []
+
+    def plot_bar(self, data):
+        labels = list(data.keys()) if data else []
+        values = [float(v) for v in data.values()] if data else []
+        if data and self.kind == 'bar' and labels == self.labels and nice_limits(values) == self.ylim:
+            for bar, value in zip(self.bars, values):
+                bar.set_height(value)
+            self._blit()
+            return
+        self._reset()
         if data:
-            labels = list(data.keys())
-            values = list(data.values())
-            self.ax.bar(labels, values, color='#3b82f6')
+            self.bars = list(self.ax.bar(labels, values, color='#3b82f6'))
+            for bar in self.bars:
+                bar.set_animated(True)
+            self.ylim = nice_limits(values)
+            self.ax.set_ylim(*self.ylim)
             self.ax.set_title('Averages', color='#ffffff', fontsize=12, fontweight='bold')
             self.ax.tick_params(axis='x', labelrotation=45)
             # cleaner look
@@ -37,21 +652,41 @@ class ChartCanvas(FigureCanvas):
             for spine in self.ax.spines.values():
                 spine.set_color('#17334b')
             self.fig.subplots_adjust(left=0.12, right=0.96, top=0.88, bottom=0.22)
+            self.kind, self.labels = 'bar', labels
         self.draw()
 
     def plot_pie(self, data):
-        self.ax.clear()
+        labels = list(data.keys()) if data else []
+        values = list(data.values()) if data else []
+        total = sum(values)
+        if data and total and self.kind == 'pie' and labels == self.labels:
+            # Same categories: move the wedge edges and percentage labels.
+            theta = 0.0
+            for wedge, text, value in zip(self.wedges, self.pct_texts, values):
+                sweep = 360.0 * value / total
+                wedge.set_theta1(theta)
+                wedge.set_theta2(theta + sweep)
+                mid = math.radians(theta + sweep / 2)
+                text.set_position((0.6 * math.cos(mid), 0.6 * math.sin(mid)))
+                text.set_text(f'{100.0 * value / total:.1f}%')
+                theta += sweep
+            self._blit()
+            return
+        self._reset()
         if data:
-            labels = list(data.keys())
-            values = list(data.values())
-            self.ax.pie(values, labels=None, autopct='%1.1f%%', textprops={'color':'#e5e7eb'})
+            wedges, _, pct_texts = self.ax.pie(values, labels=None, autopct='%1.1f%%', textprops={'color':'#e5e7eb'})
+            self.wedges, self.pct_texts = list(wedges), list(pct_texts)
             # Legend at bottom for readability (white text)
             leg = self.ax.legend(labels, loc='lower center', bbox_to_anchor=(0.5, -0.18), ncol=3, frameon=False, fontsize=8)
             for t in leg.get_texts():
                 t.set_color('#ffffff')
+            # After the legend, whose handles would copy the animated flag.
+            for artist in self._animated():
+                artist.set_animated(True)
             self.ax.set_title('Type Distribution', color='#ffffff', fontsize=12, fontweight='bold')
             self.ax.axis('equal')
             self.fig.subplots_adjust(left=0.06, right=0.94, top=0.86, bottom=0.30)
+            self.kind, self.labels = 'pie', labels
         self.draw()
 
 
@@ -62,8 +697,20 @@ class ChemFluxApp(QMainWindow):
         self.resize(1200, 720)
 
         self.username = ''
-        self.password = ''
+        self.token = ''
         self.current_dataset = None
+        # url -> (ETag, parsed JSON) for conditional GETs
+        self.validators = {}
+        self.api = ApiWorker(self)
+        self.cache = DatasetCache(default_cache_dir())
+        # dataset id -> version (updated_at) from the history list
+        self.versions = {}
+        # Debounce history clicks so only the last selection is fetched.
+        self.pending_detail = None
+        self.detailTimer = QTimer(self)
+        self.detailTimer.setSingleShot(True)
+        self.detailTimer.setInterval(150)
+        self.detailTimer.timeout.connect(lambda: self.fetch_detail(self.pending_detail))
 
         root = QWidget()
         self.setCentralWidget(root)
@@ -123,7 +770,7 @@ class ChemFluxApp(QMainWindow):
         main.addWidget(self.pages, 1)
 
         # Auth
-        authBox = QGroupBox('Authentication (DRF Basic Auth)')
+        authBox = QGroupBox('Authentication (API token)')
         authLayout = QHBoxLayout()
         authBox.setLayout(authLayout)
         authLayout.addWidget(QLabel('Username'))
@@ -163,8 +810,14 @@ class ChemFluxApp(QMainWindow):
         self.refreshBtn.clicked.connect(self.load_history)
         self.pdfBtn = QPushButton('Download PDF')
         self.pdfBtn.clicked.connect(self.download_pdf)
+        self.uploadProgress = QProgressBar()
+        self.uploadProgress.setRange(0, 1000)
+        self.uploadProgress.setTextVisible(False)
+        self.uploadProgress.setFixedWidth(160)
+        self.uploadProgress.setVisible(False)
         hLay.addWidget(subLbl)
         hLay.addStretch(1)
+        hLay.addWidget(self.uploadProgress)
         hLay.addWidget(self.selectBtn)
         hLay.addWidget(self.uploadBtn)
         hLay.addWidget(self.refreshBtn)
@@ -217,8 +870,9 @@ class ChemFluxApp(QMainWindow):
         self.totalLbl = QLabel('Total Count: -')
         sLay.addWidget(self.totalLbl)
 
-        self.avgTable = QTableWidget(0, 2)
-        self.avgTable.setHorizontalHeaderLabels(['Parameter', 'Average'])
+        self.avgModel = ListTableModel(['Parameter', 'Average'], self)
+        self.avgTable = QTableView()
+        self.avgTable.setModel(self.avgModel)
         self.avgTable.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.avgTable.verticalHeader().setDefaultSectionSize(26)
         self.avgTable.setMinimumHeight(200)
@@ -227,8 +881,9 @@ class ChemFluxApp(QMainWindow):
         self.avgTable.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
         self.avgTable.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
 
-        self.typeTable = QTableWidget(0, 2)
-        self.typeTable.setHorizontalHeaderLabels(['Type', 'Count'])
+        self.typeModel = ListTableModel(['Type', 'Count'], self)
+        self.typeTable = QTableView()
+        self.typeTable.setModel(self.typeModel)
         self.typeTable.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.typeTable.verticalHeader().setDefaultSectionSize(26)
         self.typeTable.setMinimumHeight(200)
@@ -242,7 +897,10 @@ class ChemFluxApp(QMainWindow):
         topRow.addWidget(self.typeTable, 1)
         sLay.addLayout(topRow)
 
-        self.previewTable = QTableWidget(0, 0)
+        self.rowsModel = RemoteRowsModel(self.api, self.fetch_rows, self)
+        self.rowsModel.on_error = lambda message: self.set_status(f'Rows unavailable: {message}')
+        self.previewTable = QTableView()
+        self.previewTable.setModel(self.rowsModel)
         self.previewTable.verticalHeader().setDefaultSectionSize(24)
         self.previewTable.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.previewTable.setMinimumHeight(240)
@@ -310,24 +968,50 @@ class ChemFluxApp(QMainWindow):
 
     # Helpers
     def auth(self):
-        return (self.username, self.password) if self.username and self.password else None
+        return TokenAuth(self.token) if self.token else None
 
     def set_status(self, text):
         self.statusLbl.setText(text)
 
+    def show_error(self, message):
+        self.set_status(f'Error: {message}')
+
+    def get_json(self, url, timeout=10):
+        headers = {}
+        cached = self.validators.get(url)
+        if cached:
+            headers['If-None-Match'] = cached[0]
+        r = SESSION.get(url, auth=self.auth(), headers=headers, timeout=timeout)
+        if r.status_code == 304 and cached:
+            return cached[1]
+        r.raise_for_status()
+        data = decode_response(r)
+        etag = r.headers.get('ETag')
+        if etag:
+            self.validators[url] = (etag, data)
+        return data
+
     # Actions
     def login(self):
-        self.username = self.userEdit.text().strip()
-        self.password = self.passEdit.text().strip()
-        try:
-            r = requests.get(f"{API_BASE}/datasets/", auth=self.auth(), timeout=10)
-            if r.status_code == 200:
+        username = self.userEdit.text().strip()
+        password = self.passEdit.text().strip()
+
+        def done(token):
+            self.loginBtn.setEnabled(True)
+            if token:
+                self.set_credentials(username, token)
                 self.set_status('Authenticated')
                 self.load_history()
             else:
-                self.set_status(f'Auth failed: {r.status_code}')
-        except Exception as e:
-            self.set_status(f'Error: {e}')
+                self.set_status('Auth failed: invalid credentials')
+
+        def failed(message):
+            self.loginBtn.setEnabled(True)
+            self.show_error(message)
+
+        self.loginBtn.setEnabled(False)
+        self.set_status('Signing in…')
+        self.api.submit(obtain_token, username, password, on_success=done, on_error=failed, key='login')
 
     def select_csv(self):
         path, _ = QFileDialog.getOpenFileName(self, 'Select CSV', '', 'CSV Files (*.csv)')
@@ -335,42 +1019,75 @@ class ChemFluxApp(QMainWindow):
             self.selected_csv = path
             self.set_status(f'Selected {os.path.basename(path)}')
 
+    def upload_progress(self, value):
+        name = os.path.basename(self.selected_csv or '')
+        if value[0] == 'upload':
+            _, sent, total = value
+            self.uploadProgress.setValue(int(1000 * sent / total) if total else 1000)
+            self.set_status(f'Uploading {name}: {sent / 1e6:.1f} / {total / 1e6:.1f} MB')
+        else:
+            self.uploadProgress.setValue(int(1000 * value[1]))
+            self.set_status(f'Processing {name} on the server…')
+
     def upload_csv(self):
         if not self.selected_csv:
             self.set_status('No CSV selected')
             return
-        try:
-            with open(self.selected_csv, 'rb') as f:
-                files = {'file': (os.path.basename(self.selected_csv), f, 'text/csv')}
-                r = requests.post(f"{API_BASE}/upload/", files=files, auth=self.auth(), timeout=30)
-            if r.status_code in (200, 201):
-                data = r.json()
-                self.current_dataset = data
-                self.update_summary()
-                self.set_status('Upload success')
-                self.load_history()
-            else:
-                self.set_status(f'Upload failed: {r.status_code}')
-        except Exception as e:
-            self.set_status(f'Error: {e}')
+        if self.api.busy('upload'):
+            self.set_status('Upload already in progress')
+            return
+
+        def done(data):
+            self.uploadBtn.setEnabled(True)
+            self.uploadProgress.setVisible(False)
+            self.current_dataset = data
+            self.cache_detail(data)
+            self.update_summary()
+            self.set_status('Upload success')
+            self.load_history()
+
+        def failed(message):
+            self.uploadBtn.setEnabled(True)
+            self.uploadProgress.setVisible(False)
+            # Chunks already sent are kept; Upload again resumes.
+            self.show_error(f'{message} (click Upload to resume)')
+
+        self.uploadBtn.setEnabled(False)
+        self.uploadProgress.setValue(0)
+        self.uploadProgress.setVisible(True)
+        self.set_status(f'Uploading {os.path.basename(self.selected_csv)}…')
+        uploader = ChunkedUploader(self.auth(), os.path.join(default_cache_dir(), 'uploads'))
+        self.api.submit(
+            uploader.upload, self.selected_csv,
+            on_success=done, on_error=failed, on_progress=self.upload_progress, key='upload',
+        )
 
     def load_history(self):
-        try:
-            r = requests.get(f"{API_BASE}/datasets/", auth=self.auth(), timeout=10)
-            r.raise_for_status()
-            data = r.json()
-            items = data.get('results', [])
-            self.historyList.clear()
-            if hasattr(self, 'historyListPre'):
-                self.historyListPre.clear()
+        def failed(message):
+            cached = self.cache.datasets()
+            if cached:
+                self.show_history({'results': cached})
+                self.set_status(f'Offline, showing cached datasets ({message})')
+            else:
+                self.show_error(message)
+
+        self.api.submit(
+            self.get_json, f"{API_BASE}/datasets/?fields={HISTORY_FIELDS}",
+            on_success=self.show_history, on_error=failed, key='history',
+        )
+
+    def show_history(self, data):
+        items = data.get('results', [])
+        for it in items:
+            self.versions[it['id']] = dataset_version(it)
+        # Repopulating fires itemSelectionChanged; that must not fetch.
+        for lst in (self.historyList, self.historyListPre):
+            lst.blockSignals(True)
+            lst.clear()
             for it in items:
-                text = f"{it['id']}: {it['name']} | {it['uploaded_at']}"
-                self.historyList.addItem(text)
-                if hasattr(self, 'historyListPre'):
-                    self.historyListPre.addItem(text)
-            # Do not auto-select; wait for user action
-        except Exception as e:
-            self.set_status(f'Error: {e}')
+                lst.addItem(f"{it['id']}: {it['name']} | {it['uploaded_at']}")
+            lst.blockSignals(False)
+        # Do not auto-select; wait for user action
 
     def history_selected(self):
         src = self.sender()
@@ -379,20 +1096,50 @@ class ChemFluxApp(QMainWindow):
         if not current:
             return
         text = current.text()
-        ds_id = int(text.split(':', 1)[0])
-        self.fetch_detail(ds_id)
+        self.pending_detail = int(text.split(':', 1)[0])
+        self.detailTimer.start()
         if hasattr(self, 'pages') and hasattr(self, 'dashPage'):
             self.pages.setCurrentWidget(self.dashPage)
 
-    def fetch_detail(self, ds_id):
+    def cache_detail(self, data):
+        version = dataset_version(data)
+        self.versions[data['id']] = version
+        meta = {k: data.get(k) for k in ('id', 'name', 'uploaded_at', 'updated_at')}
         try:
-            r = requests.get(f"{API_BASE}/datasets/{ds_id}/", auth=self.auth(), timeout=10)
-            r.raise_for_status()
-            self.current_dataset = r.json()
-            self.update_summary()
-            self.set_status(f'Loaded dataset {ds_id}')
-        except Exception as e:
-            self.set_status(f'Error: {e}')
+            self.cache.put(data['id'], version, 'json', json.dumps(data).encode('utf-8'), meta)
+        except OSError:
+            pass
+
+    def show_detail(self, data, status):
+        self.current_dataset = data
+        self.update_summary()
+        self.set_status(status)
+
+    def fetch_detail(self, ds_id):
+        version = self.versions.get(ds_id)
+        cached = self.cache.get(ds_id, version, 'json') if version else None
+        if cached is not None:
+            # A slower fetch of an earlier selection must not overwrite this.
+            self.api.cancel('detail')
+            self.show_detail(json.loads(cached), f'Loaded dataset {ds_id} (cached)')
+            return
+
+        def done(data):
+            self.cache_detail(data)
+            self.show_detail(data, f'Loaded dataset {ds_id}')
+
+        def failed(message):
+            stale = self.cache.latest(ds_id, 'json')
+            if stale is None:
+                self.show_error(message)
+            else:
+                self.show_detail(json.loads(stale), f'Offline copy of dataset {ds_id} ({message})')
+
+        self.set_status(f'Loading dataset {ds_id}…')
+        self.api.submit(
+            self.get_json, f"{API_BASE}/datasets/{ds_id}/",
+            on_success=done, on_error=failed, key='detail',
+        )
 
     def update_summary(self):
         ds = self.current_dataset or {}
@@ -426,29 +1173,12 @@ class ChemFluxApp(QMainWindow):
         self.statFlow.setText(str(find_avg(['flowrate','flow rate','flow'])))
         # averages table
         av = s.get('averages', {})
-        self.avgTable.setRowCount(len(av))
-        self.avgTable.setColumnCount(2)
-        self.avgTable.setHorizontalHeaderLabels(['Parameter', 'Average'])
-        for i, (k, v) in enumerate(av.items()):
-            self.avgTable.setItem(i, 0, QTableWidgetItem(str(k)))
-            self.avgTable.setItem(i, 1, QTableWidgetItem(str(v)))
+        self.avgModel.set_rows(av.items())
         # type distribution
         td = s.get('type_distribution', {})
-        self.typeTable.setRowCount(len(td))
-        self.typeTable.setColumnCount(2)
-        self.typeTable.setHorizontalHeaderLabels(['Type', 'Count'])
-        for i, (k, v) in enumerate(td.items()):
-            self.typeTable.setItem(i, 0, QTableWidgetItem(str(k)))
-            self.typeTable.setItem(i, 1, QTableWidgetItem(str(v)))
-        # preview
-        cols = s.get('columns', [])
-        prev = s.get('preview', [])
-        self.previewTable.setColumnCount(len(cols))
-        self.previewTable.setHorizontalHeaderLabels([str(c) for c in cols])
-        self.previewTable.setRowCount(len(prev))
-        for i, row in enumerate(prev):
-            for j, c in enumerate(cols):
-                self.previewTable.setItem(i, j, QTableWidgetItem(str(row.get(c, ''))))
+        self.typeModel.set_rows(td.items())
+        # rows, paged in from the server as the table scrolls
+        self.rowsModel.load(ds.get('id'), [str(c) for c in s.get('columns', [])], total, s.get('preview', []))
         # charts
         self.barCanvas.plot_bar(av)
         self.pieCanvas.plot_pie(td)
@@ -458,25 +1188,58 @@ class ChemFluxApp(QMainWindow):
             self.set_status('No dataset selected')
             return
         ds_id = self.current_dataset['id']
-        try:
-            r = requests.get(f"{API_BASE}/datasets/{ds_id}/report/", auth=self.auth(), timeout=30)
-            r.raise_for_status()
-            data = r.content
+        version = dataset_version(self.current_dataset)
+
+        def save(data):
             path, _ = QFileDialog.getSaveFileName(self, 'Save Report', f'chemflux_report_{ds_id}.pdf', 'PDF (*.pdf)')
             if path:
-                with open(path, 'wb') as f:
-                    f.write(data)
-                self.set_status(f'Saved {os.path.basename(path)}')
-        except Exception as e:
-            self.set_status(f'Error: {e}')
+                try:
+                    with open(path, 'wb') as f:
+                        f.write(data)
+                    self.set_status(f'Saved {os.path.basename(path)}')
+                except OSError as e:
+                    self.show_error(e)
+
+        cached = self.cache.get(ds_id, version, 'pdf')
+        if cached is not None:
+            save(cached)
+            return
+
+        def done(data):
+            try:
+                self.cache.put(ds_id, version, 'pdf', data)
+            except OSError:
+                pass
+            save(data)
+
+        self.set_status(f'Downloading report {ds_id}…')
+        self.api.submit(self.fetch_report, ds_id, on_success=done, on_error=self.show_error, key='report')
 
-    def set_credentials(self, username: str, password: str):
+    def fetch_rows(self, ds_id, offset, limit):
+        r = SESSION.get(
+            f"{API_BASE}/datasets/{ds_id}/rows/",
+            params={'offset': offset, 'limit': limit}, auth=self.auth(), timeout=10,
+        )
+        r.raise_for_status()
+        return decode_response(r)
+
+    def fetch_report(self, ds_id):
+        r = SESSION.get(f"{API_BASE}/datasets/{ds_id}/report/", auth=self.auth(), timeout=30)
+        r.raise_for_status()
+        return r.content
+
+    def set_credentials(self, username: str, token: str):
         self.username = username
-        self.password = password
+        self.token = token
         # Update avatar initial
         if username:
             self.avatar.setText(username[0].upper())
 
+    def closeEvent(self, event):
+        self.detailTimer.stop()
+        self.api.cancel_all()
+        super().closeEvent(event)
+
 
 class LoginDialog(QDialog):
     def __init__(self, parent=None):
@@ -499,20 +1262,33 @@ class LoginDialog(QDialog):
         lay.addWidget(btns)
         btns.accepted.connect(self.try_login)
         btns.rejected.connect(self.reject)
+        self.okBtn = btns.button(QDialogButtonBox.Ok)
+        self.api = ApiWorker(self, max_threads=1)
 
     def try_login(self):
         u = self.userEdit.text().strip()
         p = self.passEdit.text().strip()
-        try:
-            r = requests.get(f"{API_BASE}/datasets/", auth=(u, p), timeout=10)
-            if r.status_code == 200:
+
+        def done(token):
+            self.okBtn.setEnabled(True)
+            if token:
                 self.username = u
-                self.password = p
+                self.token = token
                 self.accept()
             else:
                 self.errorLbl.setText('Invalid credentials')
-        except Exception as e:
-            self.errorLbl.setText(str(e))
+
+        def failed(message):
+            self.okBtn.setEnabled(True)
+            self.errorLbl.setText(message)
+
+        self.okBtn.setEnabled(False)
+        self.errorLbl.setText('Signing in…')
+        self.api.submit(obtain_token, u, p, on_success=done, on_error=failed, key='login')
+
+    def reject(self):
+        self.api.cancel_all()
+        super().reject()
 
 
 
@@ -530,12 +1306,9 @@ def main():
     # Modal login before using the app
     dlg = LoginDialog(win)
     if dlg.exec_() == QDialog.Accepted:
-        win.set_credentials(dlg.username, dlg.password)
+        win.set_credentials(dlg.username, dlg.token)
         win.set_status('Authenticated')
-        try:
-            win.load_history()
-        except Exception:
-            pass
+        win.load_history()
     else:
         win.set_status('Not authenticated')
     win.show()